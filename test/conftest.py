@@ -0,0 +1,80 @@
+import mujoco as mj
+import numpy as np
+import pytest
+import tinysim as ts
+from tinysim.scene.environment import load_xml
+from tinysim.simulation.robot import Robot
+
+# two link arm swinging in the xz plane, position servos on both joints
+ARM = """
+<mujoco>
+  <compiler angle="radian" autolimits="true"/>
+  <worldbody>
+    <body name="base">
+      <geom type="cylinder" size="0.05 0.05" mass="1"/>
+      <body name="link1" pos="0 0 0.2">
+        <joint name="joint1" type="hinge" axis="0 1 0" range="-2.5 2.5"/>
+        <geom type="capsule" fromto="0 0 0 0.3 0 0" size="0.03" mass="1"/>
+        <body name="link2" pos="0.3 0 0">
+          <joint name="joint2" type="hinge" axis="0 1 0" range="-2.5 2.5"/>
+          <geom type="capsule" fromto="0 0 0 0.3 0 0" size="0.03" mass="1"/>
+          <body name="hand" pos="0.3 0 0">
+            <geom type="sphere" size="0.04" mass="0.2"/>
+          </body>
+        </body>
+      </body>
+    </body>
+  </worldbody>
+  <actuator>
+    <position name="actuator1" joint="joint1" kp="500" kv="30" forcerange="-80 80"/>
+    <position name="actuator2" joint="joint2" kp="500" kv="30" forcerange="-80 80"/>
+  </actuator>
+</mujoco>
+"""
+
+# same arm without joint limits
+UNLIMITED_ARM = ARM.replace(' range="-2.5 2.5"', "")
+
+SCENE = """
+<mujoco>
+  <option integrator="implicitfast"/>
+  <worldbody>
+    <body name="robot" pos="0 0 1"/>
+    {}
+  </worldbody>
+</mujoco>
+"""
+
+
+class ArmRobot(Robot):
+
+  def __init__(self, xml : str = ARM):
+    super().__init__("arm", mj.MjSpec.from_string(xml))
+    self._ctrl = np.zeros(2)
+
+  @property
+  def ctrl(self) -> np.ndarray:
+    return self._ctrl
+
+  @ctrl.setter
+  def ctrl(self, ctrl : np.ndarray):
+    self._ctrl = ctrl
+
+  @property
+  def base(self):
+    return self.body("base")
+
+  @property
+  def end_effector(self):
+    return self.body("hand")
+
+
+@pytest.fixture
+def arm_sim():
+  # builds a headless simulation of the arm, extra world body xml or a whole scene with a robot mount can be passed in
+  def build(worldbody : str = "", scene : str = SCENE, limited : bool = True, **kwargs):
+    robot = ArmRobot(ARM if limited else UNLIMITED_ARM)
+    env = load_xml(scene.format(worldbody))
+    env.attach(robot)
+    return ts.simulate(env, renderer="none", **kwargs), robot
+  return build
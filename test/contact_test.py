@@ -0,0 +1,58 @@
+import mujoco as mj
+import numpy as np
+from tinysim.scene.element import Element
+
+# 2 kg box on a vertical slide, dropped a little above the floor next to the arm
+BOX = """
+<mujoco>
+  <worldbody>
+    <body name="box" pos="1 0 0.11">
+      <joint name="lift" type="slide" axis="0 0 1"/>
+      <geom type="box" size="0.1 0.1 0.1" mass="2"/>
+    </body>
+  </worldbody>
+</mujoco>
+"""
+
+FLOOR = '<geom name="floor" type="plane" size="5 5 0.1"/>'
+
+
+def resting_box(arm_sim):
+  sim, robot = arm_sim(FLOOR)
+  box = Element("box:", mj.MjSpec.from_string(BOX))
+  sim.attach(box, sim.env.root)
+
+  for _ in range(1000):
+    sim.step()
+  return sim, robot, box
+
+def test_resting_box(arm_sim):
+  sim, robot, box = resting_box(arm_sim)
+  weight = 2 * -sim.model.opt.gravity[2]
+
+  # the floor pushes the box up with its weight
+  assert np.allclose(sim.contacts.body_forces()[box.body("box").id], [0, 0, weight], atol=1e-3)
+  assert np.isclose(weight, 19.62)
+
+def test_between(arm_sim):
+  sim, robot, box = resting_box(arm_sim)
+
+  contacts = sim.contacts.between(box, sim.env)
+  assert len(contacts) > 0
+  assert np.all(contacts["dist"] < 1e-3)
+  assert np.allclose(np.abs(contacts["normal"][:, 2]), 1)
+  assert np.isclose(np.abs(contacts["world_force"][:, 2].sum()), 19.62, atol=1e-3)
+
+  assert sim.contacts.in_contact(box.body("box"))
+  assert not sim.contacts.in_contact(box, robot)
+  assert len(sim.contacts.between(robot)) == 0
+
+def test_element_forces(arm_sim):
+  sim, robot, box = resting_box(arm_sim)
+  forces = sim.contacts.element_forces()
+  elements = sim.contacts.elements
+
+  assert np.allclose(forces[elements.index(box)], [0, 0, 19.62], atol=1e-3)
+  # the floor belongs to the environment and takes the opposite force
+  assert np.allclose(forces[elements.index(sim.env)], [0, 0, -19.62], atol=1e-3)
+  assert np.allclose(forces[elements.index(robot)], 0)
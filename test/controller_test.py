@@ -0,0 +1,107 @@
+import numpy as np
+import tinysim as ts
+from tinysim.simulation.controller import Controller, JointTorqueController, JointVelocityController, PDController
+
+
+def test_pd_gravity_compensation(arm_sim):
+  sim, robot = arm_sim()
+  gains = sim.model.actuator_gainprm[robot.actuator_idx].copy()
+
+  controller = robot.set_controller("pd", kp=20.0, kd=2.0, gravity_compensation=True, target=[0.5, -0.8])
+  # the servos of the actuators must not fight torque level controllers
+  assert np.all(sim.model.actuator_gainprm[robot.actuator_idx] == 0)
+  assert np.all(sim.model.actuator_biasprm[robot.actuator_idx] == 0)
+
+  for _ in range(2000):
+    sim.step()
+  assert np.allclose(sim.data.qpos[robot.qpos_idx], controller.target, atol=1e-3)
+
+  robot.set_controller("position", target=[0.0, 0.0])
+  assert np.all(sim.model.actuator_gainprm[robot.actuator_idx] == gains)
+  assert np.all(sim.data.qfrc_applied == 0)
+
+  for _ in range(2000):
+    sim.step()
+  # the restored servos only sag a little under gravity
+  assert np.allclose(sim.data.qpos[robot.qpos_idx], 0.0, atol=2e-2)
+
+def test_pd_without_gravity_compensation(arm_sim):
+  sim, robot = arm_sim()
+  robot.set_controller("pd", kp=20.0, kd=2.0, target=[0.5, -0.8])
+
+  for _ in range(2000):
+    sim.step()
+  # plain pd settles where its spring balances gravity
+  assert np.abs(sim.data.qpos[robot.qpos_idx] - [0.5, -0.8]).max() > 1e-2
+
+def test_position(arm_sim):
+  sim, robot = arm_sim()
+  # the actuators of the arm have no control range, only a force range
+  controller = robot.set_controller("position", target=[0.4, -0.6])
+  assert np.all(np.isinf(controller.low)) and np.all(np.isinf(controller.high))
+  assert np.all(robot.set_controller("torque").limit == 80)
+
+  robot.set_controller(controller)
+  for _ in range(1000):
+    sim.step()
+  assert np.allclose(sim.data.qpos[robot.qpos_idx], [0.4, -0.6], atol=2e-2)
+
+def test_velocity(arm_sim):
+  sim, robot = arm_sim()
+  sim.model.opt.gravity[:] = 0
+  robot.set_controller("velocity", kd=2.0, target=[0.3, -0.2])
+
+  for _ in range(500):
+    sim.step()
+  assert np.allclose(sim.data.qvel[robot.dof_idx], [0.3, -0.2], atol=1e-2)
+
+def test_limit():
+  controller = JointTorqueController(np.arange(2), np.arange(2), np.arange(2), limit=[1.0, 2.0], target=[5.0, -5.0])
+
+  class Data:
+    qpos, qvel, qfrc_applied = np.zeros(2), np.zeros(2), np.zeros(2)
+
+  controller.apply(Data)
+  assert np.all(Data.qfrc_applied == [1.0, -2.0])
+
+def test_stack():
+  a = PDController(np.arange(2), np.arange(2), np.arange(2), kp=1.0, target=[1.0, 2.0])
+  b = PDController(np.arange(2, 5), np.arange(2, 5), np.arange(2, 5), kp=2.0, target=[3.0, 4.0, 5.0])
+  stacked = Controller.stack([a, b])
+
+  assert stacked.size == 5
+  assert np.all(stacked.qpos_idx == np.arange(5))
+  assert np.all(stacked.kp == [1, 1, 2, 2, 2])
+  assert np.allclose(stacked.compute(np.zeros(5), np.zeros(5)), [1, 2, 6, 8, 10])
+
+def test_batched_compute():
+  controllers = [
+    PDController(np.arange(3), np.arange(3), np.arange(3), kp=[1.0, 2.0, 3.0], kd=0.5, target=[0.1, 0.2, 0.3]),
+    JointVelocityController(np.arange(3), np.arange(3), np.arange(3), kd=2.0, target=[1.0, 0.0, -1.0]),
+    JointTorqueController(np.arange(3), np.arange(3), np.arange(3), target=[1.0, 2.0, 3.0]),
+  ]
+  qpos, qvel = np.random.rand(16, 3), np.random.rand(16, 3)
+
+  for controller in controllers:
+    batched = controller.compute(qpos, qvel)
+    assert batched.shape == (16, 3)
+    for i in range(16):
+      assert np.allclose(batched[i], controller.compute(qpos[i], qvel[i]))
+
+def test_operational_space():
+  robot = ts.load_robot("panda")
+  env = ts.load_environment("desk")
+  env.attach(robot)
+  sim = ts.simulate(env, renderer="none")
+  # the default qpos of the panda violates the range of joint 4, start from the home keyframe
+  sim.reset(0)
+
+  hand = robot.end_effector.id
+  position = sim.data.xpos[hand] + [0.05, -0.1, -0.05]
+  quaternion = sim.data.xquat[hand][[1, 2, 3, 0]]
+  robot.set_controller("osc", position=position, quaternion=quaternion)
+
+  for _ in range(3000):
+    sim.step()
+  assert np.linalg.norm(sim.data.xpos[hand] - position) < 1e-4
+  assert min(np.abs(sim.data.xquat[hand][[1, 2, 3, 0]] - sign * quaternion).max() for sign in (1, -1)) < 1e-3
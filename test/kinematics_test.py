@@ -0,0 +1,122 @@
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import torch
+import tinysim as ts
+from tinysim.core.transform import Rotation, Transform
+from tinysim.simulation.kinematics import KinematicChain, KinematicsService
+
+
+def offset(x, y, z):
+  return Transform(torch.tensor([x, y, z], dtype=torch.float64), Rotation.identity())
+
+def planar_arm():
+  # two hinges around z with unit links along x, followed by a slide along x
+  axes = torch.tensor([[0.0, 0.0, 1.0], [0.0, 0.0, 1.0], [1.0, 0.0, 0.0]], dtype=torch.float64)
+  return KinematicChain(
+    Transform.idenity(), [offset(0, 0, 0), offset(1, 0, 0), offset(1, 0, 0)], axes,
+    torch.tensor([True, True, False]), offset(0, 0, 0.5)
+  )
+
+def test_forward():
+  chain = planar_arm()
+  qpos = torch.rand(100, 3, dtype=torch.float64)
+  position, rotation = chain.forward(qpos)
+
+  a, b, d = qpos.unbind(-1)
+  expected_x = torch.cos(a) + (1 + d) * torch.cos(a + b)
+  expected_y = torch.sin(a) + (1 + d) * torch.sin(a + b)
+  assert torch.allclose(position[:, 0], expected_x)
+  assert torch.allclose(position[:, 1], expected_y)
+  assert torch.allclose(position[:, 2], torch.full_like(a, 0.5))
+  assert torch.allclose(rotation[:, 0, 0], torch.cos(a + b))
+
+def test_jacobian():
+  chain = planar_arm()
+  qpos = torch.rand(16, 3, dtype=torch.float64).requires_grad_()
+
+  numeric = torch.autograd.functional.jacobian(lambda q: chain.forward(q)[0].sum(0), qpos).permute(1, 0, 2)
+  assert torch.allclose(chain.jacobian(qpos)[:, :3], numeric)
+  assert torch.allclose(chain.jacobian(qpos)[:, 5], torch.tensor([1.0, 1.0, 0.0], dtype=torch.float64))
+
+  assert torch.autograd.gradcheck(chain.position, (qpos,))
+
+def test_inverse():
+  chain = planar_arm()
+  target = chain.forward(torch.tensor([[0.3, 0.6, 0.2], [1.0, -0.5, 0.0]], dtype=torch.float64))[0]
+
+  qpos, converged = chain.inverse(target, torch.full((2, 3), 0.1, dtype=torch.float64))
+  assert converged.all()
+  assert torch.allclose(chain.forward(qpos)[0], target, atol=1e-4)
+
+def test_service():
+  chain = planar_arm()
+  service = KinematicsService(chain, workers=2, qpos=torch.full((3,), 0.1, dtype=torch.float64))
+  qpos = torch.rand(200, 3, dtype=torch.float64)
+
+  with ThreadPoolExecutor(4) as executor:
+    futures = list(executor.map(service.forward, qpos))
+  positions = torch.stack([future.result()[0] for future in futures])
+  assert torch.allclose(positions, chain.forward(qpos)[0])
+
+  position, quaternion = service.forward(qpos[:5]).result()
+  assert position.shape == (5, 3) and quaternion.shape == (5, 4)
+
+  solution, converged = service.inverse(positions[0]).result()
+  assert converged and torch.allclose(chain.forward(solution)[0][0], positions[0], atol=1e-4)
+
+  service.close()
+  assert service.queries == 202
+
+def test_service_close():
+  chain = planar_arm()
+  service = KinematicsService(chain, workers=2)
+  qpos = torch.rand(3, dtype=torch.float64)
+
+  def submit():
+    futures = list()
+    for _ in range(500):
+      try:
+        futures.append(service.forward(qpos))
+      except RuntimeError:
+        break
+    return futures
+
+  # queries racing the close are either answered or refused, none is left pending
+  with ThreadPoolExecutor(4) as executor:
+    submitted = [executor.submit(submit) for _ in range(4)]
+    service.close()
+  for future in (future for result in submitted for future in result.result()):
+    assert torch.allclose(future.result(timeout=1)[0], chain.forward(qpos[None])[0][0])
+
+  with pytest.raises(RuntimeError):
+    service.forward(qpos)
+
+def test_panda_inverse():
+  robot = ts.load_robot("panda")
+  env = ts.load_environment("desk")
+  env.attach(robot)
+  sim = ts.simulate(env, renderer="none")
+  sim.reset(0)
+
+  chain = KinematicChain.from_robot(robot)
+  qpos = torch.from_numpy(sim.data.qpos[sim.model.jnt_qposadr[chain.joint_ids]].copy())
+  assert torch.allclose(chain.forward(qpos)[0], torch.from_numpy(sim.data.xpos[robot.end_effector.id]))
+
+  # the default qpos of the panda is outside the range of joint 4, the seed has to be in range
+  low, high = chain.ranges.unbind(-1)
+  assert torch.all((chain.middle >= low) & (chain.middle <= high))
+
+  generator = torch.Generator().manual_seed(0)
+  targets = chain.forward(low + (high - low) * torch.rand(64, chain.size, generator=generator, dtype=torch.float64))[0]
+
+  for service in (KinematicsService.from_robot(robot), KinematicsService.from_robot(robot, keyframe=robot.name + "home")):
+    solutions, converged = service.inverse(targets).result()
+    service.close()
+
+    assert converged.all()
+    assert torch.all((solutions >= low) & (solutions <= high))
+    assert torch.allclose(chain.forward(solutions)[0], targets, atol=1e-4)
+
+  # seeds outside the ranges are clamped instead of starting on a limit
+  solutions, converged = chain.inverse(targets, torch.zeros(chain.size))
+  assert torch.all((solutions >= low) & (solutions <= high))
@@ -0,0 +1,33 @@
+import json
+import urllib.request
+from tinysim.core.metrics import Histogram, Metrics, MetricSink
+
+
+def test_histogram():
+  histogram = Histogram("latency", [1, 2, 5])
+  for value in [0.5, 1.5, 1.5, 3, 10]:
+    histogram.observe(value)
+
+  assert histogram.counts == [1, 2, 1, 1]
+  assert histogram.count == 5 and histogram.sum == 16.5
+  assert histogram.quantile(0.5) == 2
+
+def test_sinks(tmp_path):
+  metrics = Metrics()
+  memory = metrics.add_sink("memory")
+  jsonl = metrics.add_sink("jsonl", path=tmp_path / "metrics.jsonl")
+  prometheus = metrics.add_sink(MetricSink.create("prometheus", port=0))
+
+  metrics.steps.inc(3)
+  metrics.step_latency.observe(1e-3)
+  metrics.flush()
+
+  assert memory.latest["counters"]["steps"] == 3
+  assert json.loads((tmp_path / "metrics.jsonl").read_text().splitlines()[-1])["histograms"]["step_latency"]["count"] == 1
+
+  host, port = prometheus.address
+  text = urllib.request.urlopen(f"http://{host}:{port}/metrics").read().decode()
+  assert "tinysim_steps_total 3" in text
+  assert 'tinysim_step_latency_bucket{le="+Inf"} 1' in text
+
+  metrics.close()
@@ -0,0 +1,62 @@
+import numpy as np
+import tinysim as ts
+from tinysim.simulation.planner import MotionPlanner
+
+# box in the way of the arm swinging up from pointing along +x
+OBSTACLE = '<geom name="obstacle" type="box" pos="0.45 0 1.45" size="0.05 0.2 0.05"/>'
+
+
+def test_plan(arm_sim):
+  sim, robot = arm_sim(OBSTACLE)
+  planner = MotionPlanner(sim, robot)
+  start, goal = np.zeros(2), np.array([-1.2, 0.0])
+
+  assert planner.checker.is_valid(np.stack([start, goal])).all()
+  assert not planner.checker.is_valid_edge(start, goal, planner.resolution)
+
+  for seed in range(5):
+    ts.set_seed(seed)
+    path = planner.plan(goal, start)
+
+    assert path is not None
+    assert np.all(path[0] == start) and np.all(path[-1] == goal)
+    for a, b in zip(path[:-1], path[1:]):
+      assert planner.checker.is_valid_edge(a, b, planner.resolution)
+
+  planner.close()
+
+def test_seeded(arm_sim):
+  sim, robot = arm_sim(OBSTACLE)
+  planner = MotionPlanner(sim, robot, workers=1)
+
+  paths = list()
+  for _ in range(2):
+    ts.set_seed(7)
+    paths.append(planner.plan([-1.2, 0.0], np.zeros(2)))
+  assert np.all(paths[0] == paths[1])
+
+def test_invalid_goal(arm_sim):
+  sim, robot = arm_sim(OBSTACLE)
+  planner = MotionPlanner(sim, robot, workers=1)
+
+  # outside the joint range and inside the obstacle
+  assert planner.plan([3.0, 0.0], np.zeros(2)) is None
+  assert planner.plan([-0.51, 0.0], np.zeros(2)) is None
+
+def test_unlimited(arm_sim):
+  sim, robot = arm_sim(OBSTACLE, limited=False)
+  planner = MotionPlanner(sim, robot, workers=1)
+
+  # states past the sampling range stay valid
+  assert np.all(np.isinf(planner.checker.range))
+  assert planner.checker.is_valid(np.array([[4.0, 0.0], [-0.5, 3.5]])).all()
+
+  ts.set_seed(0)
+  samples = planner.sample(1000)
+  assert np.abs(samples).max() <= np.pi
+  assert np.all(samples.min(axis=0) < -3.0) and np.all(samples.max(axis=0) > 3.0)
+
+  path = planner.plan([-1.2, 0.0], np.zeros(2))
+  assert path is not None
+  for a, b in zip(path[:-1], path[1:]):
+    assert planner.checker.is_valid_edge(a, b, planner.resolution)
@@ -0,0 +1,89 @@
+import mujoco as mj
+import numpy as np
+import tinysim as ts
+from tinysim.scene.element import Element
+from tinysim.scene.environment import load_xml
+from tinysim.simulation.sensor import RaySensor
+
+XML = """
+<mujoco>
+  <worldbody>
+    <geom type="plane" size="1 1 0.1"/>
+    <body name="robot" pos="0 0 0.5">
+      <joint name="lift" type="slide" axis="0 0 1"/>
+      <geom type="box" size="0.1 0.1 0.1"/>
+    </body>
+  </worldbody>
+  <keyframe>
+    <key name="home" qpos="0.5"/>
+  </keyframe>
+</mujoco>
+"""
+
+
+def factory():
+  return ts.simulate(load_xml(XML), renderer="none")
+
+def test_pool():
+  pool = ts.SimulationPool(factory, size=2, keyframe="home")
+
+  sims = [pool.acquire() for _ in range(3)]
+  assert pool.metrics.hits + pool.metrics.misses == 3
+  assert all(sim.data.qpos[0] == 0.5 for sim in sims)
+
+  for _ in range(100):
+    sims[0].step()
+  assert sims[0].data.qpos[0] < 0.5
+
+  pool.release(sims[0])
+  pool.close()
+  assert pool.metrics.builds >= 3
+
+def test_recycle():
+  pool = ts.SimulationPool(factory, size=2, keyframe="home")
+
+  for _ in range(5):
+    sim = pool.acquire()
+    assert sim.data.time == 0 and sim.data.qpos[0] == 0.5
+    sim.step()
+    pool.release(sim)
+
+  pool.close()
+  assert pool.metrics.builds == 2 and pool.metrics.resets == 7
+
+def test_release_restores():
+  # no refills, so the released instance is the only one in the pool
+  pool = ts.SimulationPool(factory, size=1, keyframe="home", low_watermark=0)
+
+  sim = pool.acquire()
+  sim.model.opt.gravity[:] = 0
+  sim.model.geom_size[1] *= 2
+  sim.add_sensor(RaySensor(sim.env.body("robot"), [[0, 0, -1]]))
+  sim.instrument()
+  sim.set_realtime_factor(1.0)
+  pool.release(sim)
+
+  # the same instance comes back like a fresh build
+  again = pool.acquire()
+  assert again is sim
+  assert np.all(sim.model.opt.gravity == [0, 0, -9.81])
+  assert np.allclose(sim.model.geom_size[1], 0.1)
+  assert sim.sensors == [] and sim.metrics is None and sim.scheduler is None
+
+  for _ in range(100):
+    sim.step()
+  assert sim.data.qpos[0] < 0.5
+  pool.close()
+
+def test_release_drops_edited():
+  pool = ts.SimulationPool(factory, size=1, keyframe="home", low_watermark=0)
+
+  sim = pool.acquire()
+  nbody = sim.model.nbody
+  sim.attach(Element("box:", mj.MjSpec.from_string("<mujoco><worldbody><body name='box'><geom size='0.1'/></body></worldbody></mujoco>")), sim.env.body("robot"))
+  assert sim.model.nbody > nbody
+  pool.release(sim)
+
+  again = pool.acquire()
+  assert again is not sim and again.model.nbody == nbody
+  pool.close()
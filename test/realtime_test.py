@@ -0,0 +1,31 @@
+import time
+from tinysim.core.realtime import RealtimeScheduler
+
+
+def test_pacing():
+  scheduler = RealtimeScheduler(realtime_factor=2.0)
+  scheduler.reset(0.0)
+
+  start = scheduler._wall_start
+  sim_time = 0.0
+  for _ in range(50):
+    sim_time += 0.002
+    substeps = scheduler.sync(sim_time, 0.002)
+    # sync never returns before the wall clock deadline of the (sub)stepped sim time
+    assert time.perf_counter() >= start + sim_time / 2.0 or substeps > 0
+
+  # a loaded machine may run late, but never ahead of the realtime factor
+  assert time.perf_counter() - start >= 0.05
+  assert scheduler.metrics.steps == 50
+
+def test_catch_up():
+  scheduler = RealtimeScheduler(realtime_factor=1.0, max_substeps=5)
+  scheduler.reset(0.0)
+
+  time.sleep(0.02)
+  substeps = scheduler.sync(0.002, 0.002)
+
+  assert substeps == 5
+  assert scheduler.metrics.overruns == 1
+  # the lag we could not catch up on is dropped
+  assert scheduler.sync(0.002 * (substeps + 2), 0.002) <= 1
@@ -0,0 +1,52 @@
+import mujoco as mj
+import numpy as np
+from tinysim.core.replay import Recorder, Recording, replay, first_divergence
+
+XML = """
+<mujoco>
+  <worldbody>
+    <geom type="plane" size="1 1 0.1"/>
+    <body pos="0 0 0.5">
+      <freejoint/>
+      <geom type="box" size="0.1 0.1 0.1"/>
+    </body>
+    <body pos="0 0 0.2">
+      <joint name="hinge" type="hinge" axis="0 1 0"/>
+      <geom type="capsule" fromto="0 0 0 0.3 0 0" size="0.02"/>
+    </body>
+  </worldbody>
+  <actuator>
+    <motor joint="hinge"/>
+  </actuator>
+</mujoco>
+"""
+
+
+def record(model, steps):
+  data = mj.MjData(model)
+  recorder = Recorder(model, data, capacity=16)
+  controls = np.random.uniform(-1, 1, steps)
+  for ctrl in controls:
+    data.ctrl[0] = ctrl
+    recorder.record_inputs(data)
+    mj.mj_step(model, data)
+    recorder.record_step(data)
+  return recorder.finish()
+
+def test_replay(tmp_path):
+  model = mj.MjModel.from_xml_string(XML)
+  recording = record(model, 200)
+
+  assert len(recording) == 200
+  assert first_divergence(recording.hashes, replay(model, recording)) is None
+
+  recording.save(tmp_path / "recording.npz")
+  loaded = Recording.load(tmp_path / "recording.npz")
+  assert first_divergence(recording.hashes, replay(model, loaded)) is None
+
+def test_divergence():
+  model = mj.MjModel.from_xml_string(XML)
+  recording = record(model, 200)
+
+  recording.inputs[50] += 1.0
+  assert first_divergence(recording.hashes, replay(model, recording)) == 50
@@ -0,0 +1,47 @@
+import numpy as np
+from tinysim.simulation.sensor import RaySensor
+
+# the sensor looks along +x through the base of the arm onto a wall, a group 5 box sits on its left
+WORLDBODY = """
+<body name="sensor" pos="-1 0 1.02"/>
+<geom name="wall" type="box" pos="2 0 1" size="0.1 1 1"/>
+<geom name="hidden" type="box" group="5" pos="-1 2 1.02" size="0.1 0.1 0.1"/>
+"""
+
+
+def test_hits(arm_sim):
+  sim, robot = arm_sim(WORLDBODY)
+  sensor = sim.add_sensor(RaySensor(sim.env.body("sensor"), [[1, 0, 0], [0, 1, 0], [0, -1, 0]]))
+
+  assert sim.model.geom_bodyid[sensor.geom_ids[0]] == robot.base.id
+  assert np.isclose(sensor.distances[0], 0.95)
+  assert sensor.geom_ids[1] == sim.model.geom("hidden").id
+  assert np.isclose(sensor.distances[1], 1.9)
+  assert not sensor.hits[2]
+  assert np.allclose(sensor.points[0], [-0.05, 0, 1.02])
+
+def test_ignore(arm_sim):
+  sim, robot = arm_sim(WORLDBODY)
+  groups = sim.model.geom_group.copy()
+  sensor = sim.add_sensor(RaySensor(sim.env.body("sensor"), [[1, 0, 0], [0, 1, 0]], ignore=[robot]))
+
+  for _ in range(10):
+    sim.step()
+  sensor.update(sim.model, sim.data, force=True)
+
+  # the ray passes through the robot, while geoms of group 5 stay visible and the model is untouched
+  assert sensor.geom_ids[0] == sim.model.geom("wall").id
+  assert np.isclose(sensor.distances[0], 2.9)
+  assert sensor.geom_ids[1] == sim.model.geom("hidden").id
+  assert np.all(sim.model.geom_group == groups)
+
+def test_depth_rotation(arm_sim):
+  sim, robot = arm_sim(WORLDBODY)
+  # turn the camera from -z to +x
+  rotation = [0.0, -np.sqrt(0.5), 0.0, np.sqrt(0.5)]
+  sensor = sim.add_sensor(RaySensor.depth(sim.env.body("sensor"), width=3, height=3, fovy=30.0, rotation=rotation, ignore=[robot]))
+
+  depth = sensor.distances.reshape(sensor.shape)
+  assert sensor.hits.all()
+  assert np.isclose(depth[1, 1], 2.9)
+  assert np.all(depth >= 2.9 - 1e-9)
@@ -0,0 +1,106 @@
+import mujoco as mj
+import numpy as np
+import pytest
+from tinysim.scene.element import Element
+from tinysim.simulation.sensor import RaySensor
+from conftest import ArmRobot
+
+# the shelf comes before the robot mount, so everything attached to it shifts the indexes of the robot
+SCENE = """
+<mujoco>
+  <option integrator="implicitfast"/>
+  <worldbody>
+    <geom name="floor" type="plane" size="5 5 0.1"/>
+    <body name="shelf" pos="1 0 0"/>
+    <body name="robot" pos="0 0 1"/>
+    {}
+  </worldbody>
+</mujoco>
+"""
+
+BOX = """
+<mujoco>
+  <worldbody>
+    <body name="box" pos="0 0 0.11">
+      <joint name="lift" type="slide" axis="0 0 1"/>
+      <geom type="box" size="0.1 0.1 0.1" mass="2"/>
+    </body>
+  </worldbody>
+</mujoco>
+"""
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_attach_detach(arm_sim, compact):
+  sim, robot = arm_sim(scene=SCENE, compact=compact)
+  sim.set_realtime_factor(100.0)
+  robot.set_controller("position", target=[0.4, -0.6])
+  for _ in range(200):
+    sim.step()
+
+  qpos, qpos_idx = sim.data.qpos[robot.qpos_idx].copy(), robot.qpos_idx.copy()
+  box = Element("box:", mj.MjSpec.from_string(BOX))
+  sim.attach(box, sim.env.body("shelf"))
+
+  # the state of the robot is carried over to its new indexes
+  assert np.all(robot.qpos_idx == qpos_idx + 1)
+  assert np.allclose(sim.data.qpos[robot.qpos_idx], qpos)
+  assert np.isclose(sim.scheduler._sim_start, sim.data.time)
+
+  mounted = sim.add_sensor(RaySensor(box.body("box"), [[0, 0, -1]]))
+  ignoring = sim.add_sensor(RaySensor(sim.env.body("shelf"), [[0, 0, 1]], ignore=[box], exclude_body=False))
+
+  for _ in range(500):
+    sim.step()
+  assert box in sim.contacts.elements
+  assert sim.contacts.in_contact(box, sim.env)
+  assert np.allclose(sim.data.qpos[robot.qpos_idx], [0.4, -0.6], atol=2e-2)
+
+  qpos = sim.data.qpos[robot.qpos_idx].copy()
+  sim.detach(box)
+
+  assert np.all(robot.qpos_idx == qpos_idx)
+  assert np.allclose(sim.data.qpos[robot.qpos_idx], qpos)
+  assert box not in sim.contacts.elements
+  assert sim.contacts.elements.index(robot) == 1
+  assert mounted not in sim.sensors and ignoring in sim.sensors
+  assert ignoring.ignore == []
+
+  for _ in range(100):
+    sim.step()
+  assert np.all(sim.contacts.contacts["element"] != 2)
+  assert np.allclose(sim.data.qpos[robot.qpos_idx], [0.4, -0.6], atol=2e-2)
+  assert np.allclose(robot.end_effector.xtransform.position.numpy(), sim.data.xpos[sim.model.body(robot.name + "hand").id])
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_reattach(arm_sim, compact):
+  sim, robot = arm_sim(scene=SCENE, compact=compact)
+  box = Element("box:", mj.MjSpec.from_string(BOX))
+  nbody = sim.model.nbody
+
+  for _ in range(3):
+    sim.attach(box, sim.env.body("shelf"))
+    assert [body.name for body in box.bodies] == ["box:world", "box:box"]
+    assert [joint.name for joint in box.joints] == ["box:lift"]
+    assert box in sim.contacts.elements
+
+    for _ in range(100):
+      sim.step()
+    sim.detach(box)
+    assert sim.model.nbody == nbody and box not in sim.contacts.elements
+
+def test_attach_robot_to_body(arm_sim):
+  sim, robot = arm_sim(scene=SCENE)
+  other = ArmRobot()
+  sim.attach(other, sim.env.body("shelf"))
+
+  # robots attached to any body are known to the environment like the ones on mount points
+  assert sim.env.robots == [robot, other]
+  assert sim.env.mount_points == { "robot" : robot }
+  other.set_controller("position", target=[-0.3, -0.3])
+  for _ in range(500):
+    sim.step()
+  assert np.allclose(sim.data.qpos[other.qpos_idx], -0.3, atol=2e-2)
+
+  sim.detach(other)
+  assert sim.env.robots == [robot]
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from tinysim.simulation.trajectory import Trajectory
+
+
+def test_min_jerk():
+  waypoints = np.cumsum(np.random.uniform(-0.5, 0.5, (50, 7)), axis=0)
+  trajectory = Trajectory.min_jerk(waypoints, max_velocity=1.0, max_acceleration=2.0)
+
+  assert np.allclose(trajectory.evaluate(trajectory.times), waypoints)
+  assert np.allclose(trajectory.evaluate(trajectory.times, 1), 0.0)
+
+  t = np.linspace(0, trajectory.duration, 100000)
+  assert np.abs(trajectory.evaluate(t, 1)).max() <= 1.0 + 1e-6
+  assert np.abs(trajectory.evaluate(t, 2)).max() <= 2.0 + 1e-6
+
+def test_quintic():
+  waypoints = np.cumsum(np.random.uniform(0.1, 0.5, (20, 3)), axis=0)
+  trajectory = Trajectory.quintic(waypoints, max_velocity=1.0, max_acceleration=2.0)
+
+  assert np.allclose(trajectory.evaluate(trajectory.times), waypoints)
+  t = np.linspace(0, trajectory.duration, 100000)
+  assert np.abs(trajectory.evaluate(t, 1)).max() <= 1.0 + 1e-6
+  assert np.abs(trajectory.evaluate(t, 2)).max() <= 2.0 + 1e-6
+  # via points are passed without stopping
+  assert np.all(trajectory.evaluate(trajectory.times[1:-1], 1) > 0)
+
+  t, h = np.linspace(0.1, trajectory.duration - 0.1, 100), 1e-6
+  numeric = (trajectory.evaluate(t + h) - trajectory.evaluate(t - h)) / (2 * h)
+  assert np.allclose(numeric, trajectory.evaluate(t, 1), atol=1e-6)
+
+def test_retime():
+  trajectory = Trajectory.min_jerk(np.random.rand(5, 2), 1.0, 1.0)
+  slow = trajectory.retime(2.0)
+
+  t = np.linspace(0, trajectory.duration, 100)
+  assert np.isclose(slow.duration, 2 * trajectory.duration)
+  assert np.allclose(slow.evaluate(2 * t), trajectory.evaluate(t))
+  assert np.allclose(slow.evaluate(2 * t, 1), trajectory.evaluate(t, 1) / 2)
+
+def test_quintic_limits():
+  # zig zags with short segments are the hardest case for stretching single segments
+  for seed in range(10):
+    rng = np.random.default_rng(seed)
+    waypoints = np.cumsum(rng.uniform(-0.3, 0.3, (30, 4)), axis=0)
+    trajectory = Trajectory.quintic(waypoints, max_velocity=[1.0, 0.5, 2.0, 1.0], max_acceleration=2.0)
+
+    t = np.linspace(0, trajectory.duration, 100000)
+    assert np.allclose(trajectory.evaluate(trajectory.times), waypoints)
+    assert np.all(np.abs(trajectory.evaluate(t, 1)).max(axis=0) <= np.array([1.0, 0.5, 2.0, 1.0]) + 1e-6)
+    assert np.abs(trajectory.evaluate(t, 2)).max() <= 2.0 + 1e-6
+
+def test_play(arm_sim):
+  sim, robot = arm_sim()
+  sim.model.opt.gravity[:] = 0
+  trajectory = Trajectory.from_robot(robot, [[0.0, 0.0], [0.5, -0.5], [0.8, -1.0]], max_velocity=1.0, max_acceleration=2.0)
+
+  for name, kwargs in (("position", dict()), ("pd", dict(kp=50.0, kd=5.0)), ("velocity", dict(kd=5.0))):
+    sim.reset()
+    robot.set_controller(name, **kwargs)
+    robot.play(trajectory)
+
+    for _ in range(int((trajectory.duration + 1.0) / sim.model.opt.timestep)):
+      sim.step()
+    assert robot.player is None
+    assert np.allclose(sim.data.qpos[robot.qpos_idx], [0.8, -1.0], atol=5e-2)
+
+def test_play_rejects(arm_sim):
+  sim, robot = arm_sim()
+  trajectory = Trajectory.from_robot(robot, [[0.0, 0.0], [0.5, -0.5]])
+
+  robot.set_controller("torque")
+  with pytest.raises(ValueError):
+    robot.play(trajectory)
+
+  # switching to a controller without setpoints stops a running trajectory
+  robot.set_controller("position")
+  robot.play(trajectory)
+  robot.set_controller("torque")
+  assert robot.player is None
+  sim.step()
+
+def test_from_robot_ranges(arm_sim):
+  waypoints = [[0.0, 0.0], [0.5, -0.5], [0.8, -1.0], [3.0, -3.0]]
+
+  sim, robot = arm_sim()
+  trajectory = Trajectory.from_robot(robot, waypoints)
+  assert np.allclose(trajectory.waypoints[-1], [2.5, -2.5])
+
+  # unlimited joints are not clipped
+  sim, robot = arm_sim(limited=False)
+  trajectory = Trajectory.from_robot(robot, waypoints)
+  assert np.allclose(trajectory.waypoints, waypoints)
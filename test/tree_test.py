@@ -0,0 +1,98 @@
+import mujoco as mj
+import numpy as np
+from tinysim.simulation.tree import BodyHandle, SceneTree
+
+XML = """
+<mujoco>
+  <worldbody>
+    <body name="a" pos="1 0 0">
+      <joint name="a0" type="hinge" axis="0 0 1"/>
+      <geom size="0.1"/>
+      <body name="b" pos="0 1 0">
+        <joint name="b0" type="slide" axis="1 0 0" range="-1 1"/>
+        <geom size="0.1"/>
+      </body>
+      <body name="c" pos="0 0 1">
+        <geom size="0.1"/>
+      </body>
+    </body>
+    <body name="d" pos="2 0 0">
+      <joint name="d0" type="hinge"/>
+      <geom size="0.1"/>
+    </body>
+  </worldbody>
+</mujoco>
+"""
+
+
+def test_structure():
+  model = mj.MjModel.from_xml_string(XML)
+  tree = SceneTree(model)
+
+  assert [body.name for body in tree.bodies] == ["world", "a", "b", "c", "d"]
+  assert [child.name for child in tree.body("a").children] == ["b", "c"]
+  assert [body.name for body in tree.body("a").get_all_bodies()] == ["a", "b", "c"]
+  assert [joint.name for joint in tree.body("a").get_all_joints()] == ["a0", "b0"]
+  assert tree.body("b").parent == tree.body("a")
+  assert tree.body("b").joints[0].range == (-1.0, 1.0)
+  assert list(tree.depth()) == [0, 1, 2, 2, 1]
+
+  subtree = SceneTree(model, tree.body("a").id)
+  assert len(subtree) == 3 and subtree.root.parent is None
+
+def test_update():
+  model = mj.MjModel.from_xml_string(XML)
+  data = mj.MjData(model)
+  data.qpos[:] = [0.5, 0.2, -0.3]
+  mj.mj_kinematics(model, data)
+
+  tree = SceneTree(model)
+  tree.update(data)
+
+  for body in tree.bodies:
+    assert np.allclose(body.xtransform.position.numpy(), data.xpos[body.id])
+    assert np.allclose(body.xtransform.rotation.to_quat().numpy(), data.xquat[body.id][[1, 2, 3, 0]])
+  assert [joint.qpos.item() for joint in tree.joints] == [0.5, 0.2, -0.3]
+
+def test_arrays():
+  # random tree, children, depth and subtrees against plain parent walks
+  rng = np.random.default_rng(0)
+  spec = mj.MjSpec()
+  bodies = [spec.worldbody]
+  for i in range(1, 60):
+    bodies.append(bodies[rng.integers(0, i)].add_body(name=f"b{i}"))
+    bodies[-1].add_geom(size=[0.1, 0, 0])
+  tree = SceneTree(spec.compile())
+
+  ancestors = list()
+  for i in range(len(tree)):
+    ancestors.append(list())
+    parent = tree.parent[i]
+    while parent >= 0:
+      ancestors[i].append(parent)
+      parent = tree.parent[parent]
+
+  for i in range(len(tree)):
+    assert list(tree.children(i)) == list(np.flatnonzero(tree.parent == i))
+    assert tree.depth()[i] == len(ancestors[i])
+    assert list(range(i + 1, tree.subtree_end[i])) == [j for j in range(len(tree)) if i in ancestors[j]]
+  assert tree.body(int(tree.body_id[17])).id == tree.body_id[17]
+
+def test_compact(arm_sim):
+  sim, robot = arm_sim(compact=True)
+  robot.set_controller("position", target=[0.4, -0.6])
+  for _ in range(200):
+    sim.step()
+
+  # bodies and joints of the elements are handles reading the arrays of the tree
+  assert all(isinstance(body, BodyHandle) for body in sim.env.bodies)
+  assert [joint.name for joint in robot.joints] == [robot.name + "joint1", robot.name + "joint2"]
+  assert np.allclose([joint.qpos.item() for joint in robot.joints], sim.data.qpos[robot.qpos_idx])
+
+  hand = sim.data.xpos[robot.end_effector.id]
+  assert np.allclose(robot.end_effector.xtransform.position.numpy(), hand)
+  assert np.allclose(robot.forward_kinematic().position.numpy(), hand)
+  assert robot.chain[-1].name == robot.name + "link2"
+
+  # the object trees are never built
+  assert sim.env._object_root is None and robot._object_root is None
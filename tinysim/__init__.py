@@ -3,3 +3,4 @@ from tinysim.core.random import set_seed
 from tinysim.simulation.robot import Robot, load_robot
 from tinysim.scene.environment import Environment, load_environment
 from tinysim.core.simulation import Simulation, simulate
+from tinysim.core.pool import SimulationPool
@@ -0,0 +1,128 @@
+import mujoco as mj
+import numpy as np
+
+from tinysim.scene.element import Element
+from tinysim.simulation.body import SceneBody
+
+
+CONTACT_DTYPE = np.dtype([
+  ("geom", np.int32, 2),
+  ("body", np.int32, 2),
+  ("element", np.int32, 2),
+  ("dist", np.float64),
+  ("pos", np.float64, 3),
+  ("normal", np.float64, 3),
+  # force/torque on the second geom, in the contact frame and in world coordinates
+  ("force", np.float64, 6),
+  ("world_force", np.float64, 3),
+])
+
+
+class ContactBuffer:
+
+  def __init__(self, capacity : int = 256):
+    self._buffer = np.zeros(capacity, dtype=CONTACT_DTYPE)
+    self._count = 0
+    self._forces_valid = False
+
+    self.elements : list[Element] = list()
+
+  def bind(self, model, scene : Element):
+    self.elements = list()
+    self._body_element = np.full(model.nbody, -1, dtype=np.int32)
+
+    def register(element : Element):
+      # attached elements overwrite the bodies of their parent
+      self._body_element[[body.id for body in element.bodies]] = len(self.elements)
+      self.elements.append(element)
+      for child in element._attached_elements:
+        register(child)
+
+    register(scene)
+    self._geom_body = model.geom_bodyid.astype(np.int32)
+    self._geom_element = self._body_element[self._geom_body]
+
+    self._model = model
+    self._count = 0
+
+  def update(self, data):
+    n = data.ncon
+    if n > len(self._buffer):
+      self._buffer = np.zeros(max(n, 2 * len(self._buffer)), dtype=CONTACT_DTYPE)
+
+    self._count = n
+    self._forces_valid = False
+    if n == 0: return
+
+    contacts, buffer = data.contact, self._buffer[:n]
+    buffer["geom"] = contacts.geom
+    buffer["body"] = self._geom_body[contacts.geom]
+    buffer["element"] = self._geom_element[contacts.geom]
+    buffer["dist"] = contacts.dist
+    buffer["pos"] = contacts.pos
+    # the first row of the contact frame is the normal, pointing from geom 0 to geom 1
+    buffer["normal"] = contacts.frame[:, :3]
+
+    self._data = data
+
+  @property
+  def count(self) -> int:
+    return self._count
+
+  @property
+  def contacts(self) -> np.ndarray:
+    self._compute_forces()
+    return self._buffer[:self._count]
+
+  def _compute_forces(self):
+    if self._forces_valid or self._count == 0: return
+
+    buffer = self._buffer[:self._count]
+    force = buffer["force"]
+    for i in range(self._count):
+      mj.mj_contactForce(self._model, self._data, i, force[i])
+
+    frames = self._data.contact.frame.reshape(-1, 3, 3)
+    buffer["world_force"] = np.einsum("nij,ni->nj", frames, force[:, :3])
+    self._forces_valid = True
+
+  def _id(self, ident : Element | SceneBody | int) -> int:
+    if isinstance(ident, Element):
+      return self.elements.index(ident)
+    if isinstance(ident, SceneBody):
+      return ident.id
+    return ident
+
+  def _mask(self, a : Element | SceneBody | int, b : Element | SceneBody | int = None) -> np.ndarray:
+    contacts = self._buffer[:self._count]
+
+    field_a = "element" if isinstance(a, Element) else "body"
+    pair_a = contacts[field_a] == self._id(a)
+    if b is None:
+      return pair_a[:, 0] | pair_a[:, 1]
+
+    field_b = "element" if isinstance(b, Element) else "body"
+    pair_b = contacts[field_b] == self._id(b)
+    return (pair_a[:, 0] & pair_b[:, 1]) | (pair_a[:, 1] & pair_b[:, 0])
+
+  def between(self, a : Element | SceneBody | int, b : Element | SceneBody | int = None) -> np.ndarray:
+    mask = self._mask(a, b)
+    if not mask.any(): return self._buffer[:0]
+    return self.contacts[mask]
+
+  def in_contact(self, a : Element | SceneBody | int, b : Element | SceneBody | int = None) -> bool:
+    return bool(self._mask(a, b).any())
+
+  def body_forces(self) -> np.ndarray:
+    # net contact force on every body in world coordinates
+    forces = np.zeros((self._model.nbody, 3))
+    contacts = self.contacts
+    np.add.at(forces, contacts["body"][:, 1], contacts["world_force"])
+    np.subtract.at(forces, contacts["body"][:, 0], contacts["world_force"])
+    return forces
+
+  def element_forces(self) -> np.ndarray:
+    forces = np.zeros((len(self.elements), 3))
+    owner = self._body_element >= 0
+    np.add.at(forces, self._body_element[owner], self.body_forces()[owner])
+    return forces
@@ -0,0 +1,279 @@
+from bisect import bisect_left
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import math
+import threading
+import time
+
+import mujoco as mj
+
+from tinysim.core.profile import Profile
+
+
+# seconds, log spaced from 10 us to 1 s
+LATENCY_BOUNDS = [10 ** (e / 4) for e in range(-20, 1)]
+ITERATION_BOUNDS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+WARNINGS = [name.removeprefix("mjWARN_").lower() for name in mj.mjtWarning.__members__ if name != "mjNWARNING"]
+
+
+class Counter:
+  __slots__ = ("name", "value")
+
+  def __init__(self, name : str):
+    self.name = name
+    self.value = 0
+
+  def inc(self, amount : int = 1):
+    self.value += amount
+
+
+class Gauge:
+  __slots__ = ("name", "value")
+
+  def __init__(self, name : str):
+    self.name = name
+    self.value = 0.0
+
+  def set(self, value : float):
+    self.value = value
+
+
+class Histogram:
+  __slots__ = ("name", "bounds", "counts", "sum", "count")
+
+  def __init__(self, name : str, bounds : list[float] = LATENCY_BOUNDS):
+    self.name = name
+    self.bounds = list(bounds)
+    # last bucket collects everything above the largest bound
+    self.counts = [0] * (len(self.bounds) + 1)
+    self.sum = 0.0
+    self.count = 0
+
+  def observe(self, value : float):
+    self.counts[bisect_left(self.bounds, value)] += 1
+    self.sum += value
+    self.count += 1
+
+  def quantile(self, q : float) -> float:
+    # upper bound of the bucket containing the quantile
+    rank, seen = q * self.count, 0
+    for bound, count in zip(self.bounds, self.counts):
+      seen += count
+      if seen >= rank and seen > 0:
+        return bound
+    return math.inf
+
+
+class MetricSink:
+
+  SINKS = dict()
+
+  @classmethod
+  def register(cls, sink : type["MetricSink"]) -> type["MetricSink"]:
+    assert hasattr(sink, "NAME")
+
+    cls.SINKS[sink.NAME] = sink
+    return sink
+
+  @classmethod
+  def create(cls, name : str, **kwargs) -> "MetricSink":
+    if name not in cls.SINKS:
+      raise ValueError("Invalid metric sink, select one of", cls.SINKS.keys())
+    return cls.SINKS[name](**kwargs)
+
+  def write(self, snapshot : dict):
+    ...
+
+  def close(self):
+    ...
+
+
+@MetricSink.register
+class MemorySink(MetricSink):
+
+  NAME = "memory"
+
+  def __init__(self, capacity : int = 1024):
+    self.snapshots : deque[dict] = deque(maxlen=capacity)
+
+  @property
+  def latest(self) -> dict:
+    return self.snapshots[-1] if self.snapshots else None
+
+  def write(self, snapshot : dict):
+    self.snapshots.append(snapshot)
+
+
+@MetricSink.register
+class JsonLinesSink(MetricSink):
+
+  NAME = "jsonl"
+
+  def __init__(self, path : str):
+    self.file = open(path, "a")
+
+  def write(self, snapshot : dict):
+    self.file.write(json.dumps(snapshot) + "\n")
+    self.file.flush()
+
+  def close(self):
+    self.file.close()
+
+
+@MetricSink.register
+class PrometheusSink(MetricSink):
+
+  NAME = "prometheus"
+
+  def __init__(self, port : int = 9464, host : str = "127.0.0.1", prefix : str = "tinysim"):
+    self.prefix = prefix
+    self._text = b""
+
+    sink = self
+    class Handler(BaseHTTPRequestHandler):
+      def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.end_headers()
+        self.wfile.write(sink._text)
+
+      def log_message(self, *args):
+        ...
+
+    self.server = ThreadingHTTPServer((host, port), Handler)
+    self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+    self._thread.start()
+
+  @property
+  def address(self) -> tuple[str, int]:
+    return self.server.server_address
+
+  def write(self, snapshot : dict):
+    # rendered once per flush, scrapes only read the finished bytes
+    self._text = self.render(snapshot).encode()
+
+  def render(self, snapshot : dict) -> str:
+    lines = list()
+    for name, value in snapshot["counters"].items():
+      lines += [f"# TYPE {self.prefix}_{name}_total counter", f"{self.prefix}_{name}_total {value}"]
+
+    for name, value in snapshot["gauges"].items():
+      lines += [f"# TYPE {self.prefix}_{name} gauge", f"{self.prefix}_{name} {value}"]
+
+    for name, histogram in snapshot["histograms"].items():
+      lines.append(f"# TYPE {self.prefix}_{name} histogram")
+      cumulative = 0
+      for bound, count in zip(histogram["bounds"] + ["+Inf"], histogram["counts"]):
+        cumulative += count
+        lines.append(f'{self.prefix}_{name}_bucket{{le="{bound}"}} {cumulative}')
+      lines += [f"{self.prefix}_{name}_sum {histogram['sum']}", f"{self.prefix}_{name}_count {histogram['count']}"]
+
+    for name, profile in snapshot["profiles"].items():
+      lines += [
+        f'{self.prefix}_profile_calls_total{{function="{name}"}} {profile["calls"]}',
+        f'{self.prefix}_profile_seconds_total{{function="{name}"}} {profile["total_time"]}',
+      ]
+
+    return "\n".join(lines) + "\n"
+
+  def close(self):
+    self.server.shutdown()
+    self.server.server_close()
+
+
+class Metrics:
+
+  def __init__(self, sinks : list[MetricSink] = None, sample : int = 10, interval : float = 1.0):
+    # every sample-th step is timed, sinks get a snapshot every interval seconds
+    self.sinks = list() if sinks is None else list(sinks)
+    self.sample = sample
+    self.interval = interval
+
+    self.counters : dict[str, Counter] = dict()
+    self.gauges : dict[str, Gauge] = dict()
+    self.histograms : dict[str, Histogram] = dict()
+
+    self._next_flush = time.perf_counter() + interval
+    self._last_flush = time.perf_counter()
+    self._last_steps = 0
+
+    # step loop metrics are created up front, so the hot path only touches existing objects
+    self.steps = self.counter("steps")
+    self.substeps = self.counter("substeps")
+    self.step_latency = self.histogram("step_latency")
+    self.render_latency = self.histogram("render_latency")
+    self.steps_per_second = self.gauge("steps_per_second")
+    self.sim_time = self.gauge("sim_time")
+
+  def counter(self, name : str) -> Counter:
+    if name not in self.counters:
+      self.counters[name] = Counter(name)
+    return self.counters[name]
+
+  def gauge(self, name : str) -> Gauge:
+    if name not in self.gauges:
+      self.gauges[name] = Gauge(name)
+    return self.gauges[name]
+
+  def histogram(self, name : str, bounds : list[float] = LATENCY_BOUNDS) -> Histogram:
+    if name not in self.histograms:
+      self.histograms[name] = Histogram(name, bounds)
+    return self.histograms[name]
+
+  def add_sink(self, sink : MetricSink | str, **kwargs) -> MetricSink:
+    if isinstance(sink, str):
+      sink = MetricSink.create(sink, **kwargs)
+    self.sinks.append(sink)
+    return sink
+
+  def sampled(self, step : int) -> bool:
+    return step % self.sample == 0
+
+  def update_simulation(self, sim):
+    # called on sampled steps only, reads the rarely changing state of the simulation
+    now = time.perf_counter()
+    if now < self._next_flush: return
+
+    self.steps_per_second.set((self.steps.value - self._last_steps) / (now - self._last_flush))
+    self.sim_time.set(float(sim.data.time))
+
+    for name, warning in zip(WARNINGS, sim.data.warning):
+      self.gauge(f"warning_{name}").set(warning.number)
+
+    if sim.scheduler is not None:
+      self.gauge("realtime_factor").set(sim.scheduler.metrics.rtf)
+      self.gauge("realtime_jitter").set(sim.scheduler.metrics.jitter)
+
+    self._last_steps = self.steps.value
+    self._last_flush = now
+    self.flush()
+
+  def snapshot(self) -> dict:
+    return {
+      "time": time.time(),
+      "counters": { name : counter.value for name, counter in self.counters.items() },
+      "gauges": { name : gauge.value for name, gauge in self.gauges.items() },
+      "histograms": {
+        name : { "bounds": histogram.bounds, "counts": list(histogram.counts), "sum": histogram.sum, "count": histogram.count }
+        for name, histogram in self.histograms.items()
+      },
+      "profiles": {
+        name : { "calls": profile.calls, "total_time": profile.total_time, "time_avg": profile.time_avg }
+        for name, profile in Profile._PROFILES.items()
+      },
+    }
+
+  def flush(self):
+    self._next_flush = time.perf_counter() + self.interval
+    if len(self.sinks) == 0: return
+
+    snapshot = self.snapshot()
+    for sink in self.sinks:
+      sink.write(snapshot)
+
+  def close(self):
+    self.flush()
+    for sink in self.sinks:
+      sink.close()
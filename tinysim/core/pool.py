@@ -0,0 +1,204 @@
+from concurrent.futures import ThreadPoolExecutor
+import copy
+from dataclasses import dataclass
+from typing import Callable
+import queue
+import threading
+import time
+
+import mujoco as mj
+import numpy as np
+
+from tinysim.core.simulation import Simulation, simulate
+from tinysim.scene.environment import load_environment
+from tinysim.simulation.robot import load_robot
+
+
+@dataclass
+class PoolMetrics:
+  hits: int = 0
+  misses: int = 0
+  builds: int = 0
+  resets: int = 0
+  build_time: float = 0.0
+  reset_time: float = 0.0
+
+  @property
+  def hit_rate(self) -> float:
+    requests = self.hits + self.misses
+    return self.hits / requests if requests > 0 else 0.0
+
+
+@dataclass
+class _Pristine:
+  # state of a fresh build, released instances are checked against and restored to it
+  spec_hash: str
+  model: mj.MjModel
+  sensors: list
+  metrics: object
+  scheduler: object
+
+
+def _model_parameters(model) -> list[str]:
+  return [name for name in dir(model) if not name.startswith("_") and isinstance(value := getattr(model, name), np.ndarray) and value.flags.writeable]
+
+def _option_fields(model) -> list[str]:
+  return [name for name in dir(model.opt) if not name.startswith("_")]
+
+
+class SimulationPool:
+
+  def __init__(self, factory : Callable[[], Simulation], size : int = 4, keyframe : int | str = 0, workers : int = 1, low_watermark : int = 1):
+    assert size > 0, "Pool size has to be positive"
+
+    self.factory = factory
+    self.size = size
+    # released instances are recycled, new ones are only built once fewer than low_watermark are ready or underway
+    self.low_watermark = min(low_watermark, size)
+    self.keyframe = keyframe
+    self.metrics = PoolMetrics()
+
+    self._ready : queue.SimpleQueue[Simulation] = queue.SimpleQueue()
+    self._pristine : dict[int, _Pristine] = dict()
+    self._parameters : list[str] = None
+    self._options : list[str] = None
+    self._pending = 0
+    self._waiting = 0
+    self._closed = False
+
+    self._lock = threading.Lock()
+    # loading robots bumps global name counters, so builds never run concurrently
+    self._build_lock = threading.Lock()
+    self._executor = ThreadPoolExecutor(workers)
+
+    self._refill(force=True)
+
+  @classmethod
+  def create(cls, environment : str, robots : list[str] = ("panda",), size : int = 4, keyframe : int | str = 0,
+             workers : int = 1, low_watermark : int = 1, **kwargs) -> "SimulationPool":
+    kwargs.setdefault("renderer", "none")
+
+    def factory() -> Simulation:
+      env = load_environment(environment)
+      for robot in robots:
+        env.attach(load_robot(robot))
+      return simulate(env, **kwargs)
+
+    return cls(factory, size, keyframe, workers, low_watermark)
+
+  def acquire(self) -> Simulation:
+    try:
+      sim = self._ready.get_nowait()
+      with self._lock:
+        self.metrics.hits += 1
+    except queue.Empty:
+      # pool ran dry, wait for an instance already underway nobody else waits for or build one in the calling thread
+      with self._lock:
+        self.metrics.misses += 1
+        wait = self._pending > self._waiting
+        self._waiting += wait
+
+      if wait:
+        sim = self._ready.get()
+        with self._lock:
+          self._waiting -= 1
+      else:
+        sim = self._build()
+
+    self._refill()
+    if isinstance(sim, BaseException):
+      raise sim
+    return sim
+
+  def release(self, sim : Simulation):
+    # finished episodes go back into the pool after a keyframe reset, surplus and structurally edited instances are dropped
+    with self._lock:
+      pristine = self._pristine.get(id(sim))
+      keep = not self._closed and self._ready.qsize() + self._pending < self.size
+      keep = keep and pristine is not None and sim.env.id == pristine.spec_hash
+      if not keep:
+        self._pristine.pop(id(sim), None)
+
+    if not keep:
+      sim.close()
+      self._refill()
+      return
+
+    self._restore(sim, pristine)
+    self._reset(sim)
+    self._ready.put(sim)
+
+  def close(self):
+    with self._lock:
+      self._closed = True
+    self._executor.shutdown(wait=True)
+
+    while not self._ready.empty():
+      sim = self._ready.get_nowait()
+      if isinstance(sim, Simulation): sim.close()
+    self._pristine.clear()
+
+  def _restore(self, sim : Simulation, pristine : _Pristine):
+    # parameters are copied in place, data and renderer stay bound to the model
+    for name in self._parameters:
+      np.copyto(getattr(sim.model, name), getattr(pristine.model, name))
+    for name in self._options:
+      setattr(sim.model.opt, name, getattr(pristine.model.opt, name))
+
+    # sensors, metrics and realtime pacing added during the episode
+    sim.sensors = list(pristine.sensors)
+    sim.metrics = pristine.metrics
+    sim.scheduler = pristine.scheduler
+
+  def _reset(self, sim : Simulation):
+    start = time.perf_counter()
+    sim.reset(self.keyframe if sim.model.nkey > 0 else None)
+
+    with self._lock:
+      self.metrics.resets += 1
+      self.metrics.reset_time += (time.perf_counter() - start - self.metrics.reset_time) / self.metrics.resets
+
+  def _build(self) -> Simulation:
+    start = time.perf_counter()
+    with self._build_lock:
+      sim = self.factory()
+
+    # fresh and recycled instances start from the same state
+    self._reset(sim)
+
+    pristine = _Pristine(sim.env.id, copy.copy(sim.model), list(sim.sensors), sim.metrics, sim.scheduler)
+    with self._lock:
+      if self._parameters is None:
+        self._parameters, self._options = _model_parameters(sim.model), _option_fields(sim.model)
+      self._pristine[id(sim)] = pristine
+      self.metrics.builds += 1
+      self.metrics.build_time += (time.perf_counter() - start - self.metrics.build_time) / self.metrics.builds
+    return sim
+
+  def _refill(self, force : bool = False):
+    with self._lock:
+      if self._closed: return
+      available = self._ready.qsize() + self._pending
+      missing = self.size - available if force or available < self.low_watermark else 0
+      self._pending += max(missing, 0)
+
+    for _ in range(missing):
+      self._executor.submit(self._fill)
+
+  def _fill(self):
+    try:
+      sim = self._build()
+    except Exception as e:
+      # handed to the next acquire, so failing builds surface instead of starving the pool
+      sim = e
+    self._put(sim)
+
+  def _put(self, sim : Simulation):
+    with self._lock:
+      self._pending -= 1
+      closed = self._closed
+
+    if closed:
+      if isinstance(sim, Simulation): sim.close()
+    else:
+      self._ready.put(sim)
@@ -6,7 +6,7 @@ SEED = None
 
 
 def set_seed(seed):
-  global RANDOM_GEN
+  global RANDOM_GEN, SEED
   SEED = seed
   RANDOM_GEN = np.random.default_rng(seed)
 
@@ -0,0 +1,100 @@
+from dataclasses import dataclass
+import math
+import time
+
+
+@dataclass
+class RealtimeMetrics:
+  rtf: float = 0.0
+  jitter: float = 0.0
+  lag: float = 0.0
+  overruns: int = 0
+  substeps: int = 0
+  steps: int = 0
+
+
+class RealtimeScheduler:
+  def __init__(self, realtime_factor : float = 1.0, spin_threshold : float = 1e-3, max_substeps : int = 10, window : float = 1.0):
+    assert realtime_factor > 0, "Realtime factor has to be positive"
+
+    self.realtime_factor = realtime_factor
+    self.spin_threshold = spin_threshold
+    self.max_substeps = max_substeps
+    self.window = window
+
+    self.metrics = RealtimeMetrics()
+    self._wall_start = None
+
+  def reset(self, sim_time : float = 0.0):
+    now = time.perf_counter()
+
+    self._wall_start = now
+    self._sim_start = sim_time
+
+    self._window_wall = now
+    self._window_sim = sim_time
+
+    self._err_mean = 0.0
+    self._err_m2 = 0.0
+    self._err_count = 0
+
+    self.metrics = RealtimeMetrics()
+
+  def sync(self, sim_time : float, timestep : float) -> int:
+    if self._wall_start is None:
+      self.reset(sim_time)
+      return 0
+
+    self.metrics.steps += 1
+
+    deadline = self._wall_start + (sim_time - self._sim_start) / self.realtime_factor
+    lag = time.perf_counter() - deadline
+
+    substeps = 0
+    if lag < 0:
+      self._sleep_until(deadline)
+      self._record_error(time.perf_counter() - deadline)
+    else:
+      step_time = timestep / self.realtime_factor
+      if lag > step_time:
+        self.metrics.overruns += 1
+
+      substeps = min(int(lag / step_time), self.max_substeps)
+
+      # drop the time we can not catch up on, otherwise the lag keeps growing forever
+      behind = lag - substeps * step_time
+      if behind > step_time:
+        self._wall_start += behind
+
+      self.metrics.substeps += substeps
+
+    self.metrics.lag = max(lag, 0.0)
+    self._update_rtf(sim_time + substeps * timestep)
+    return substeps
+
+  def _sleep_until(self, deadline : float):
+    # coarse sleep, then spin for the last bit as os sleeps overshoot
+    remaining = deadline - time.perf_counter()
+    if remaining > self.spin_threshold:
+      time.sleep(remaining - self.spin_threshold)
+
+    while time.perf_counter() < deadline:
+      pass
+
+  def _record_error(self, error : float):
+    # Welford's online variance of the wake up error
+    self._err_count += 1
+    delta = error - self._err_mean
+    self._err_mean += delta / self._err_count
+    self._err_m2 += delta * (error - self._err_mean)
+
+    self.metrics.jitter = math.sqrt(self._err_m2 / self._err_count)
+
+  def _update_rtf(self, sim_time : float):
+    now = time.perf_counter()
+    elapsed = now - self._window_wall
+    if elapsed < self.window: return
+
+    self.metrics.rtf = (sim_time - self._window_sim) / elapsed
+    self._window_wall = now
+    self._window_sim = sim_time
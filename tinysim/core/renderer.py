@@ -32,6 +32,9 @@ class SimulationRenderer():
   def update_scene(self, sim):
     ...
 
+  def reload_scene(self, sim):
+    ...
+
   def close(self, sim):
     ...
 
@@ -55,6 +58,11 @@ class MjRenderer(SimulationRenderer):
   def update_scene(self, sim):
     self.viewer.sync()
 
+  def reload_scene(self, sim):
+    # the passive viewer is bound to the model it was launched with
+    self.close(sim)
+    self.init_scene(sim)
+
   def close(self, sim):
     self.viewer.close()
 
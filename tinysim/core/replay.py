@@ -0,0 +1,100 @@
+from dataclasses import dataclass
+from hashlib import blake2b
+
+import mujoco as mj
+import numpy as np
+
+import tinysim.core.random as random
+
+
+# everything mj_step integrates, including warmstart, so replays are bitwise identical
+STATE = mj.mjtState.mjSTATE_INTEGRATION
+# ctrl, applied forces, mocap and equality toggles written by controllers each step
+INPUTS = mj.mjtState.mjSTATE_USER
+
+
+def state_hash(data) -> int:
+  digest = blake2b(data.qpos.tobytes(), digest_size=8)
+  digest.update(data.qvel.tobytes())
+  return int.from_bytes(digest.digest(), "little")
+
+
+def first_divergence(hashes : np.ndarray, other : np.ndarray) -> int:
+  # index of the first step the two runs differ in, None if they agree on their common length
+  n = min(len(hashes), len(other))
+  diverged = np.flatnonzero(hashes[:n] != other[:n])
+  return int(diverged[0]) if len(diverged) > 0 else None
+
+
+@dataclass
+class Recording:
+  seed: int
+  initial_state: np.ndarray
+  inputs: np.ndarray
+  substeps: np.ndarray
+  hashes: np.ndarray
+
+  def __len__(self):
+    return len(self.hashes)
+
+  def save(self, path : str):
+    np.savez_compressed(
+      path, seed=np.array(-1 if self.seed is None else self.seed), initial_state=self.initial_state,
+      inputs=self.inputs, substeps=self.substeps, hashes=self.hashes
+    )
+
+  @classmethod
+  def load(cls, path : str) -> "Recording":
+    data = np.load(path)
+    seed = int(data["seed"])
+    return cls(None if seed == -1 else seed, data["initial_state"], data["inputs"], data["substeps"], data["hashes"])
+
+
+class Recorder:
+
+  def __init__(self, model, data, capacity : int = 4096):
+    self.model = model
+    self.seed = random.get_seed()
+
+    self.initial_state = np.zeros(mj.mj_stateSize(model, STATE))
+    mj.mj_getState(model, data, self.initial_state, STATE)
+
+    self._inputs = np.zeros((capacity, mj.mj_stateSize(model, INPUTS)))
+    self._substeps = np.zeros(capacity, dtype=np.int32)
+    self._hashes = np.zeros(capacity, dtype=np.uint64)
+    self._count = 0
+
+  def record_inputs(self, data):
+    if self._count == len(self._hashes):
+      self._inputs = np.concatenate([self._inputs, np.zeros_like(self._inputs)])
+      self._substeps = np.concatenate([self._substeps, np.zeros_like(self._substeps)])
+      self._hashes = np.concatenate([self._hashes, np.zeros_like(self._hashes)])
+
+    mj.mj_getState(self.model, data, self._inputs[self._count], INPUTS)
+
+  def record_step(self, data, substeps : int = 0):
+    self._substeps[self._count] = substeps
+    self._hashes[self._count] = state_hash(data)
+    self._count += 1
+
+  def finish(self) -> Recording:
+    n = self._count
+    return Recording(self.seed, self.initial_state, self._inputs[:n].copy(), self._substeps[:n].copy(), self._hashes[:n].copy())
+
+
+def replay(model, recording : Recording, data = None) -> np.ndarray:
+  # headless lockstep replay of the recorded inputs, returns the state hash after every step
+  data = mj.MjData(model) if data is None else data
+  if recording.seed is not None:
+    random.set_seed(recording.seed)
+
+  mj.mj_setState(model, data, recording.initial_state, STATE)
+
+  hashes = np.zeros(len(recording), dtype=np.uint64)
+  for step in range(len(recording)):
+    mj.mj_setState(model, data, recording.inputs[step], INPUTS)
+    for _ in range(1 + recording.substeps[step]):
+      mj.mj_step(model, data)
+    hashes[step] = state_hash(data)
+
+  return hashes
@@ -5,9 +5,16 @@ import numpy as np
 import torch
 
 from tinysim.scene.element import Element
+from tinysim.simulation.body import SceneBody
+from tinysim.simulation.tree import BodyHandle, SceneTree
 from tinysim.core.transform import Rotation, Transform
 
 from tinysim.core.renderer import SimulationRenderer as Renderer
+from tinysim.core.realtime import RealtimeScheduler, RealtimeMetrics
+from tinysim.simulation.sensor import RaySensor
+from tinysim.core.contact import ContactBuffer
+from tinysim.core.replay import Recorder, Recording, replay, first_divergence
+from tinysim.core.metrics import Metrics
 
 
 def simulate(env : Element, **kwargs):
@@ -15,11 +22,23 @@ def simulate(env : Element, **kwargs):
 
 class Simulation:
 
-  def __init__(self, scene : Element = None, renderer = "mjviewer", visualize_groups = set(range(3)), render_args = {}):
+  def __init__(self, scene : Element = None, renderer = "mjviewer", visualize_groups = set(range(3)), render_args = {}, realtime_factor : float = None,
+               compact : bool = False):
 
     self.model = None
+    # compact simulations keep body and joint state only in the arrays of the scene tree
+    self.compact = compact
     self.visualize_groups = visualize_groups   
     self.renderer : Renderer = Renderer.create(renderer, **render_args)
+    self.scheduler : RealtimeScheduler = None
+    self.sensors : list[RaySensor] = list()
+    self.contacts = ContactBuffer()
+    self.recorder : Recorder = None
+    self._tree : SceneTree = None
+    self.metrics : Metrics = None
+
+    if realtime_factor is not None:
+      self.set_realtime_factor(realtime_factor)
 
     if scene is not None:
       self.load_environment(scene)
@@ -29,12 +48,15 @@ class Simulation:
   
     self.model = scene.compile()
     self.env = scene
+    self.data = mj.MjData(self.model)
+    mj.mj_forward(self.model, self.data)
+
+    self._bind_tree()
     self.joints = scene.joints
     self.objects = scene.bodies
 
-
-    self.data = mj.MjData(self.model)
-    mj.mj_forward(self.model, self.data)
+    self.contacts.bind(self.model, scene)
+    self.contacts.update(self.data)
 
     self.env._on_simulation_init(self)
     self._scene_update()
@@ -43,25 +65,190 @@ class Simulation:
     self.renderer.init_scene(self)
     self.renderer.update_scene(self)
 
+    if self.scheduler is not None:
+      self.scheduler.reset(self.data.time)
+
+  def attach(self, element : Element, mount_point : str | SceneBody | BodyHandle = None):
+    self.env.attach(element, mount_point)
+
+    self._recompile()
+    element._on_simulation_init(self)
+    self.env._on_simulation_recompile(self)
+    self._scene_update()
+
+  def detach(self, element : Element):
+    # sensors mounted on the element would keep the id of a body that no longer exists
+    ids = { body.id for body in element.bodies }
+    self.sensors = [sensor for sensor in self.sensors if sensor.body.id not in ids]
+    for sensor in self.sensors:
+      sensor.ignore = [ignored for ignored in sensor.ignore if ignored.root.id not in ids]
+
+    self.env.detach(element)
+
+    self._recompile()
+    self.env._on_simulation_recompile(self)
+    self._scene_update()
+
+  def _recompile(self):
+    self.model, self.data = self.env.recompile(self.model, self.data)
+    mj.mj_forward(self.model, self.data)
+
+    self._bind_tree()
+    self.joints = self.env.joints
+    self.objects = self.env.bodies
+
+    self.contacts.bind(self.model, self.env)
+    self.contacts.update(self.data)
+    for sensor in self.sensors:
+      # handles index into the previous tree
+      if isinstance(sensor.body, BodyHandle):
+        sensor.body = self._tree.body(sensor.body.name)
+      sensor._bind(self.model)
+
+    # recompiling takes wall time the physics should not catch up on
+    if self.scheduler is not None:
+      self.scheduler.reset(self.data.time)
+
+    self.renderer.reload_scene(self)
+
+  def reset(self, keyframe : int | str = None):
+    # restores the initial or keyframe state in place, much cheaper than rebuilding the simulation
+    if keyframe is None:
+      mj.mj_resetData(self.model, self.data)
+    else:
+      mj.mj_resetDataKeyframe(self.model, self.data, self.model.key(keyframe).id)
+
+    mj.mj_forward(self.model, self.data)
+    self.contacts.update(self.data)
+    self.recorder = None
+
+    self.env._on_simulation_reset(self)
+    self._scene_update()
+
+    for sensor in self.sensors:
+      sensor._next_update = -math.inf
+    self._sensor_update()
+
+    if self.scheduler is not None:
+      self.scheduler.reset(self.data.time)
+    self.renderer.update_scene(self)
+
   def close(self):
-    self.renderer.close()
+    if self.metrics is not None:
+      self.metrics.close()
+    self.renderer.close(self)
 
   def step(self):
-    
+    # only every sample-th step is timed to keep the overhead of live metrics low
+    metrics = self.metrics
+    timed = metrics is not None and metrics.sampled(metrics.steps.value)
+    if timed:
+      start = time.perf_counter()
+
     self.env.step()
 
+    if self.recorder is not None:
+      self.recorder.record_inputs(self.data)
+
     mj.mj_step(self.model, self.data)
+
+    substeps = 0
+    if self.scheduler is not None:
+      # catch up by substepping the physics with the last ctrl when we fell behind the wall clock
+      substeps = self.scheduler.sync(self.data.time, self.model.opt.timestep)
+      for _ in range(substeps):
+        mj.mj_step(self.model, self.data)
+
+    if self.recorder is not None:
+      self.recorder.record_step(self.data, substeps)
     
+    self.contacts.update(self.data)
     self._scene_update()
+    self._sensor_update()
+
+    if timed:
+      render_start = time.perf_counter()
+
     self.renderer.update_scene(self)
 
+    if metrics is not None:
+      metrics.steps.inc()
+      metrics.substeps.inc(substeps)
+
+      if timed:
+        end = time.perf_counter()
+        metrics.step_latency.observe(render_start - start)
+        metrics.render_latency.observe(end - render_start)
+        metrics.update_simulation(self)
+
+  def add_sensor(self, sensor : RaySensor) -> RaySensor:
+    sensor._bind(self.model)
+    sensor.update(self.model, self.data, force=True)
+    self.sensors.append(sensor)
+    return sensor
+
+  def remove_sensor(self, sensor : RaySensor):
+    self.sensors.remove(sensor)
+
+  def record(self) -> Recorder:
+    self.recorder = Recorder(self.model, self.data)
+    return self.recorder
+
+  def stop_recording(self) -> Recording:
+    recording = self.recorder.finish()
+    self.recorder = None
+    return recording
+
+  def replay(self, recording : Recording) -> int:
+    # replays headless on a scratch MjData, returns the first step diverging from the recording or None
+    return first_divergence(recording.hashes, replay(self.model, recording))
+
+  def instrument(self, metrics : Metrics = None, **kwargs) -> Metrics:
+    self.metrics = metrics if metrics is not None else Metrics(**kwargs)
+    return self.metrics
+
+  def set_realtime_factor(self, realtime_factor : float = None, **kwargs):
+    if realtime_factor is None:
+      self.scheduler = None
+      return
+
+    self.scheduler = RealtimeScheduler(realtime_factor, **kwargs)
+    if self.model is not None:
+      self.scheduler.reset(self.data.time)
+
+  @property
+  def realtime_metrics(self) -> RealtimeMetrics:
+    return self.scheduler.metrics if self.scheduler is not None else None
+
   def get_renderer(self) -> Renderer:
     return self.renderer
 
   def is_running(self):
     return self.renderer.is_running()
 
+  def _sensor_update(self):
+    for sensor in self.sensors:
+      sensor.update(self.model, self.data)
+
+  @property
+  def tree(self) -> SceneTree:
+    # built on first use, afterwards refreshed every step with a few array copies
+    if self._tree is None:
+      self._tree = self.env.compact(self.model)
+      self._tree.update(self.data)
+    return self._tree
+
+  def _bind_tree(self):
+    self._tree = None
+    if not self.compact: return
+
+    # the elements hand out handles into the tree instead of their own bodies and joints
+    self.env._bind_tree(self.tree)
+
   def _scene_update(self):
+    if self._tree is not None:
+      self._tree.update(self.data)
+    if self.compact: return
 
     # update sim bodies pose
     for obj in self.objects:
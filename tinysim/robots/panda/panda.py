@@ -19,17 +19,32 @@ class PandaRobot(Robot):
 
     model = sim.model
 
-    self._acts_idx = [model.actuator(self.name + "actuator" + str(i)).id for i in range(1, 9)]
+    self._bind_panda_actuators(model)
     self._ctrl = np.zeros(len(self._acts_idx))
-
-    self._ee_body : SceneBody = self.body("hand")
-    self._base_body : SceneBody = self.body("link0")
+    self._bind_bodies()
 
     self._ctrl[:] = model.key(self.name+"home").ctrl
 
     self.sim = sim
     super()._on_simulation_init(sim)  
 
+  def _on_simulation_recompile(self, sim):
+    self._bind_panda_actuators(sim.model)
+    self._bind_bodies()
+    self.sim = sim
+    super()._on_simulation_recompile(sim)
+
+  def _on_simulation_reset(self, sim):
+    self._ctrl[:] = sim.model.key(self.name+"home").ctrl
+    super()._on_simulation_reset(sim)
+
+  def _bind_bodies(self):
+    self._ee_body : SceneBody = self.body("hand")
+    self._base_body : SceneBody = self.body("link0")
+
+  def _bind_panda_actuators(self, model):
+    self._acts_idx = np.array([model.actuator(self.name + "actuator" + str(i)).id for i in range(1, 9)], dtype=np.intp)
+
   def step(self):
     self.sim.data.ctrl[self._acts_idx] = self._ctrl
     return super().step()
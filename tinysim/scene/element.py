@@ -5,14 +5,23 @@ from hashlib import md5
 import numpy as np
 
 from tinysim.simulation.body import SceneBody
+from tinysim.simulation.tree import SceneTree
 
 
 class Element:
   def __init__(self, name : str, spec) -> None:
     self._name = name
     self._spec = spec
+    # the body our bodies hang off in the spec, the worldbody until the element gets attached
+    self._body_spec = spec.worldbody
+    self._frame = None
 
-    self._root = SceneBody.from_spec(spec.worldbody)
+    # the object tree is built on first use, compact simulations read the arrays of a tree instead
+    self._object_root : SceneBody = None
+    self._model = None
+    # set by compact simulations, bodies and joints are then read from the arrays of the tree
+    self._tree : SceneTree = None
+    self._spare_spec = None
 
     self._attached_elements = list()
   
@@ -22,36 +31,85 @@ class Element:
   
   @property
   def root(self):
+    if self._tree is not None:
+      return self._tree.body(self._body_spec.name)
     return self._root
+
+  @property
+  def _root(self) -> SceneBody:
+    if self._object_root is None:
+      # attached elements share their object tree with ours
+      attached = { element._body_spec.name : element._root for element in self._attached_elements }
+      self._object_root = SceneBody.from_spec(self._body_spec, attached=attached)
+      if self._model is not None:
+        self._bind_model(self._model)
+    return self._object_root
   
   @property
   def bodies(self):
-    return self._root.get_all_bodies()
+    return self.root.get_all_bodies()
   
   @property
   def joints(self):
-    return self._root.get_all_joints()
+    return self.root.get_all_joints()
   
+  def compact(self, model) -> SceneTree:
+    # array backed copy of the compiled element tree, for large scenes
+    return SceneTree(model, model.body(self._body_spec.name).id)
+
+  def _bind_tree(self, tree : SceneTree):
+    self._tree = tree
+    for element in self._attached_elements:
+      element._bind_tree(tree)
+
   def body(self, ident : int | str) -> SceneBody:
     return next(body for body in self.bodies if body.name == ident or body.id == ident or body.name == f"{self.name}{ident}")
   
   def joint(self, ident : int | str) -> SceneBody:
     return next(joint for joint in self.joints if joint.name == ident or joint.id == ident or joint.name == f"{self.name}{ident}")
 
-  def attach(self, element : "Element", mount_point : SceneBody):
+  def attach(self, element : "Element", mount_point : str | SceneBody):
+    # the spec is edited directly, object trees are only updated when they were built
+    name = mount_point if isinstance(mount_point, str) else mount_point.name
+    mount_spec = self._spec.body(name)
+    if mount_spec is None:
+      raise ValueError("Invalid mount point", name)
+
+    # attaching moves the bodies of the element spec into ours, a copy restores the element on detach
+    element._spare_spec = element._spec.copy()
+    element._frame = mount_spec.add_frame()
+    element._frame.attach_body(element._body_spec, element.name, '')
 
-    assert mount_point in self.bodies
-    mount_point.attach(element._root, element.name)
+    # mujoco prefixes the attached body and joint names with the element name (2 pandas in one scene etc)
+    element._body_spec = self._spec.body(f"{element.name}world")
+    element._object_root = None
+    self._attached_elements.append(element)
 
-    # body names are unique, so we need to rename them (2 pandas in one scene etc)
-    for body in element.bodies:
-      body.name = f"{element.name}{body.name}"
+    if self._object_root is not None:
+      mount = next(body for body in self._object_root.get_all_bodies() if body.name == name)
+      mount.children.append(element._root)
+      element._root.parent = mount
 
-    # same with joints
-    for joint in element.joints:
-      joint.name = f"{element.name}{joint.name}"
+  def detach(self, element : "Element"):
 
-    self._attached_elements.append(element)  
+    assert element in self._attached_elements
+
+    # the attached copy of the element lives in our spec
+    self._spec.delete(element._body_spec)
+    self._spec.delete(element._frame)
+
+    self._attached_elements.remove(element)
+    if element._object_root is not None and element._object_root.parent is not None:
+      element._object_root.parent.detach(element._object_root)
+
+    element._bind_tree(None)
+    element._restore()
+
+  def _restore(self):
+    # back to the spec from before attaching, with unprefixed names, so the element can be attached again
+    self._spec, self._spare_spec = self._spare_spec, None
+    self._body_spec, self._frame = self._spec.worldbody, None
+    self._object_root, self._model = None, None
 
   def compile(self):
 
@@ -59,23 +117,45 @@ class Element:
     self.compiled = True
     self.id: str = md5(self.env_spec.to_xml().encode()).hexdigest()
 
+    self._bind_model(model)
+    return model
+
+  def recompile(self, model, data):
+    # in place recompilation, mujoco carries the state of unchanged bodies and joints over by name
+    model, data = self._spec.recompile(model, data)
+    self.id: str = md5(self.env_spec.to_xml().encode()).hexdigest()
+
+    self._bind_model(model)
+    return model, data
 
-    for body in self.bodies:
+  def _bind_model(self, model):
+    self._model = model
+    for element in self._attached_elements:
+      element._bind_model(model)
+    if self._object_root is None: return
+
+    for body in self._object_root.get_all_bodies():
       model_body = model.body(body.name)
       body.id = model_body.id
       body.position_rel = model_body.pos
       body.rotation_rel = model_body.quat
 
-    for joint in self.joints:
+    for joint in self._object_root.get_all_joints():
       joint.id = model.jnt(joint.name).id
-
-    return model
   
 
   def _on_simulation_init(self, sim):
     for element in self._attached_elements:
       element._on_simulation_init(sim)
 
+  def _on_simulation_recompile(self, sim):
+    for element in self._attached_elements:
+      element._on_simulation_recompile(sim)
+
+  def _on_simulation_reset(self, sim):
+    for element in self._attached_elements:
+      element._on_simulation_reset(sim)
+
   def step(self):
     for element in self._attached_elements:
       element.step()
\ No newline at end of file
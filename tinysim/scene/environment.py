@@ -56,20 +56,32 @@ class Environment(Element):
   def from_xml(self, xml : str):
     return Environment("custom", mj.MjSpec.from_string(xml), EnvironmentConfig("custom.xml", "robot"))
   
-  def attach(self, robot : Robot, mount_point = None):
+  def attach(self, robot : Robot, mount_point : str | SceneBody = None):
+    # besides the configured mount points, elements can be attached to any body of the environment
+    if mount_point is not None and not isinstance(mount_point, str):
+      mount_point = mount_point.name
 
-    if mount_point:
+    if mount_point in self.mount_points:
       assert self.mount_points[mount_point] == None, f"Mount point {mount_point} is already occupied"
       self.mount_points[mount_point] = robot
-    else:
+    elif mount_point is None:
       free_mounts = [key for key in self.mount_points.keys() if self.mount_points[key] is None]
       assert len(free_mounts) > 0, "Not more free mounts to attach to"
       mount_point = free_mounts[0]
       self.mount_points[mount_point] = robot
 
+    if isinstance(robot, Robot):
+      self.robots.append(robot)
 
-    self.robots.append(robot)
+    super().attach(robot, mount_point)
 
-    mp = { body.name : body for body in self.bodies }[mount_point]
+  def detach(self, robot : Robot):
 
-    super().attach(robot, mp)
\ No newline at end of file
+    super().detach(robot)
+
+    if robot in self.robots:
+      self.robots.remove(robot)
+
+    for mount_point, mounted in self.mount_points.items():
+      if mounted is robot:
+        self.mount_points[mount_point] = None
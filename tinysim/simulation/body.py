@@ -26,9 +26,16 @@ class SceneBody:
 
   spec : mj.MjsBody = None
   parent : "SceneBody" = None
+  frame : mj.MjsFrame = None
 
   @classmethod
-  def from_spec(cls, spec, parent = None):
+  def from_spec(cls, spec, parent = None, attached : dict[str, "SceneBody"] = {}):
+    # bodies of attached elements are taken over from their own object tree
+    if spec.name in attached:
+      body = attached[spec.name]
+      body.parent = parent
+      return body
+
     body =  cls(
       name=spec.name,
       itransform=Transform(
@@ -41,15 +48,19 @@ class SceneBody:
       spec=spec,
 
     )
-    body.children = [SceneBody.from_spec(child, body) for child in spec.bodies]
+    body.children = [SceneBody.from_spec(child, body, attached) for child in spec.bodies]
     body.joints = [Joint.from_spec(joint) for joint in spec.joints]
     return body
   
   def attach(self, body : "SceneBody", namespace : str) -> "SceneBody":
-    frame = self.spec.add_frame()
-    frame.attach_body(body.spec, namespace, '')
+    body.frame = self.spec.add_frame()
+    body.frame.attach_body(body.spec, namespace, '')
     self.children.append(body)
 
+  def detach(self, body : "SceneBody"):
+    assert body in self.children
+    self.children.remove(body)
+
   def get_all_bodies(self) -> List["SceneBody"]:
     bodies = [self]
     for child in self.children:
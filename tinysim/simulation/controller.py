@@ -0,0 +1,324 @@
+from abc import ABC, abstractmethod
+import copy
+
+import mujoco as mj
+import numpy as np
+
+
+class Controller(ABC):
+
+  CONTROLLERS = dict()
+
+  # field of MjData the controller output is scattered into
+  OUTPUT = "ctrl"
+  # per joint arrays, concatenated when stacking controllers
+  PARAMS = ("target",)
+  # joint setpoint kept in target ("qpos" or "qvel"), trajectories can only be played on controllers that have one
+  SETPOINT = None
+
+  @classmethod
+  def register(cls, controller : "Controller"):
+    assert hasattr(controller, "NAME")
+
+    cls.CONTROLLERS[controller.NAME] = controller
+    return controller
+
+  @classmethod
+  def create(cls, name : str, robot, **kwargs) -> "Controller":
+    if name not in cls.CONTROLLERS:
+      raise ValueError("Invalid controller, select one of", cls.CONTROLLERS.keys())
+    return cls.CONTROLLERS[name].from_robot(robot, **kwargs)
+
+  def __init__(self, qpos_idx : np.ndarray, dof_idx : np.ndarray, out_idx : np.ndarray, limit : np.ndarray = None, target : np.ndarray = None):
+    self.qpos_idx = np.ascontiguousarray(qpos_idx, dtype=np.intp)
+    self.dof_idx = np.ascontiguousarray(dof_idx, dtype=np.intp)
+    self.out_idx = np.ascontiguousarray(out_idx, dtype=np.intp)
+
+    n = len(self.qpos_idx)
+    assert len(self.dof_idx) == n and len(self.out_idx) == n
+
+    self.limit = None if limit is None else self._param(limit)
+    self.target = self._param(target)
+
+    self._qpos = np.zeros(n)
+    self._qvel = np.zeros(n)
+    self._out = np.zeros(n)
+
+  @classmethod
+  def from_robot(cls, robot, **kwargs) -> "Controller":
+    out_idx = robot.actuator_idx if cls.OUTPUT == "ctrl" else robot.dof_idx
+    kwargs.setdefault("target", robot.sim.data.qpos[robot.qpos_idx] if cls.OUTPUT == "ctrl" else None)
+    return cls(robot.qpos_idx, robot.dof_idx, out_idx, **{ **cls._robot_kwargs(robot), **kwargs })
+
+  @classmethod
+  def _robot_kwargs(cls, robot) -> dict:
+    return dict()
+
+  def _rebind(self, robot):
+    self.qpos_idx = robot.qpos_idx
+    self.dof_idx = robot.dof_idx
+    self.out_idx = robot.actuator_idx if self.OUTPUT == "ctrl" else robot.dof_idx
+
+  @classmethod
+  def stack(cls, controllers : list["Controller"]) -> "Controller":
+    assert len(controllers) > 0 and all(type(ctrl) is type(controllers[0]) for ctrl in controllers)
+
+    stacked = copy.copy(controllers[0])
+    for name in ("qpos_idx", "dof_idx", "out_idx", "_qpos", "_qvel", "_out") + stacked.PARAMS:
+      setattr(stacked, name, np.concatenate([getattr(ctrl, name) for ctrl in controllers]))
+
+    if stacked.limit is not None:
+      stacked.limit = np.concatenate([ctrl.limit for ctrl in controllers])
+    return stacked
+
+  @property
+  def size(self) -> int:
+    return len(self.qpos_idx)
+
+  def _param(self, value, default : float = 0.0) -> np.ndarray:
+    param = np.empty(self.size)
+    param[:] = default if value is None else value
+    return param
+
+  @abstractmethod
+  def compute(self, qpos : np.ndarray, qvel : np.ndarray, out : np.ndarray = None) -> np.ndarray:
+    ...
+
+  def _feedforward(self, data, out : np.ndarray):
+    ...
+
+  def apply(self, data):
+    np.take(data.qpos, self.qpos_idx, out=self._qpos)
+    np.take(data.qvel, self.dof_idx, out=self._qvel)
+
+    out = self.compute(self._qpos, self._qvel, self._out)
+    self._feedforward(data, out)
+
+    if self.limit is not None:
+      np.clip(out, -self.limit, self.limit, out=out)
+
+    getattr(data, self.OUTPUT)[self.out_idx] = out
+
+
+@Controller.register
+class JointPositionController(Controller):
+
+  NAME = "position"
+  PARAMS = ("target", "low", "high")
+  SETPOINT = "qpos"
+
+  def __init__(self, qpos_idx, dof_idx, out_idx, ctrlrange : np.ndarray = None, **kwargs):
+    super().__init__(qpos_idx, dof_idx, out_idx, **kwargs)
+    ctrlrange = np.full((self.size, 2), [-np.inf, np.inf]) if ctrlrange is None else ctrlrange
+    self.low = self._param(ctrlrange[:, 0])
+    self.high = self._param(ctrlrange[:, 1])
+
+  @classmethod
+  def _robot_kwargs(cls, robot) -> dict:
+    model = robot.sim.model
+    # unlimited actuators report a control range of [0, 0]
+    ctrlrange = model.actuator_ctrlrange[robot.actuator_idx].copy()
+    ctrlrange[model.actuator_ctrllimited[robot.actuator_idx] == 0] = [-np.inf, np.inf]
+    return dict(ctrlrange=ctrlrange)
+
+  def compute(self, qpos, qvel, out = None):
+    # the position servos of the actuators track the target
+    return np.clip(np.broadcast_to(self.target, np.shape(qpos)), self.low, self.high, out=out)
+
+
+class TorqueController(Controller):
+
+  OUTPUT = "qfrc_applied"
+
+  @classmethod
+  def _robot_kwargs(cls, robot) -> dict:
+    model = robot.sim.model
+    limit = np.abs(model.actuator_forcerange[robot.actuator_idx]).max(axis=1)
+    limit[model.actuator_forcelimited[robot.actuator_idx] == 0] = np.inf
+    return dict(limit=limit)
+
+
+@Controller.register
+class JointTorqueController(TorqueController):
+
+  NAME = "torque"
+
+  def compute(self, qpos, qvel, out = None):
+    if out is None: return np.broadcast_to(self.target, np.shape(qpos)).copy()
+
+    out[...] = self.target
+    return out
+
+
+@Controller.register
+class JointVelocityController(TorqueController):
+
+  NAME = "velocity"
+  PARAMS = ("target", "kd")
+  SETPOINT = "qvel"
+
+  def __init__(self, qpos_idx, dof_idx, out_idx, kd = 10.0, **kwargs):
+    super().__init__(qpos_idx, dof_idx, out_idx, **kwargs)
+    self.kd = self._param(kd)
+
+  def compute(self, qpos, qvel, out = None):
+    out = np.subtract(self.target, qvel, out=out)
+    return np.multiply(self.kd, out, out=out)
+
+
+@Controller.register
+class PDController(TorqueController):
+
+  NAME = "pd"
+  PARAMS = ("target", "qvel_target", "torque", "kp", "kd")
+  SETPOINT = "qpos"
+
+  def __init__(self, qpos_idx, dof_idx, out_idx, kp = 100.0, kd = 10.0, qvel_target = None, torque = None, gravity_compensation : bool = False, **kwargs):
+    super().__init__(qpos_idx, dof_idx, out_idx, **kwargs)
+    self.kp = self._param(kp)
+    self.kd = self._param(kd)
+    self.qvel_target = self._param(qvel_target)
+    self.torque = self._param(torque)
+    self.gravity_compensation = gravity_compensation
+
+  @classmethod
+  def from_robot(cls, robot, **kwargs):
+    kwargs.setdefault("target", robot.sim.data.qpos[robot.qpos_idx])
+    return super().from_robot(robot, **kwargs)
+
+  def compute(self, qpos, qvel, out = None):
+    # tau = kp * (q* - q) + kd * (qd* - qd) + tau_ff
+    out = np.subtract(self.target, qpos, out=out)
+    out *= self.kp
+    out += self.kd * (self.qvel_target - qvel)
+    out += self.torque
+    return out
+
+  def _feedforward(self, data, out):
+    if self.gravity_compensation:
+      out += data.qfrc_bias[self.dof_idx]
+
+
+@Controller.register
+class ImpedanceController(PDController):
+
+  NAME = "impedance"
+
+  def __init__(self, qpos_idx, dof_idx, out_idx, gravity_compensation : bool = True, **kwargs):
+    super().__init__(qpos_idx, dof_idx, out_idx, gravity_compensation=gravity_compensation, **kwargs)
+
+
+@Controller.register
+class OperationalSpaceController(TorqueController):
+
+  NAME = "osc"
+  PARAMS = ("target", "kp_null", "kd_null")
+
+  def __init__(self, qpos_idx, dof_idx, out_idx, model, body_id : int, position : np.ndarray, quaternion : np.ndarray = None, 
+               kp = 200.0, kd = None, kp_null = 10.0, kd_null = None, **kwargs):
+    super().__init__(qpos_idx, dof_idx, out_idx, **kwargs)
+
+    self.model = model
+    self.body_id = body_id
+
+    # quaternions are xyzw like tinysim.core.transform.Rotation, position only control if None
+    self.position = np.array(position, dtype=np.float64)
+    self.quaternion = None if quaternion is None else np.array(quaternion, dtype=np.float64)
+
+    self.kp = np.empty(6)
+    self.kp[:] = kp
+    self.kd = 2 * np.sqrt(self.kp) if kd is None else np.broadcast_to(kd, (6,)).astype(np.float64)
+
+    self.kp_null = self._param(kp_null)
+    self.kd_null = 2 * np.sqrt(self.kp_null) if kd_null is None else self._param(kd_null)
+
+    self._allocate(model.nv)
+
+  def _allocate(self, nv : int):
+    # every buffer used per tick, sized for the task (3 rows position only, 6 with orientation)
+    rows = 3 if self.quaternion is None else 6
+    self._rows = rows
+
+    self._jac = np.zeros((6, nv))
+    self._jac_minv = np.zeros((rows, nv))
+    self._task_inertia = np.zeros((rows, rows))
+    self._error = np.zeros(rows)
+    self._task_vel = np.zeros(rows)
+    self._force = np.zeros(rows)
+    self._task_tmp = np.zeros(rows)
+    self._quat = np.zeros(3)
+    self._target_quat = np.zeros(4)
+    self._posture = np.zeros(nv)
+    self._mposture = np.zeros(nv)
+    self._tau = np.zeros(nv)
+
+  @classmethod
+  def from_robot(cls, robot, **kwargs):
+    model, data = robot.sim.model, robot.sim.data
+    body = robot.end_effector.id
+
+    kwargs.setdefault("target", data.qpos[robot.qpos_idx])
+    kwargs.setdefault("position", data.xpos[body])
+    return super().from_robot(robot, model=model, body_id=body, **kwargs)
+
+  def _rebind(self, robot):
+    super()._rebind(robot)
+    self.model = robot.sim.model
+    self.body_id = robot.end_effector.id
+    self._allocate(self.model.nv)
+
+  def compute(self, qpos, qvel, out = None):
+    # null space posture acceleration, projected and mapped to torques in _feedforward
+    out = np.subtract(self.target, qpos, out=out)
+    out *= self.kp_null
+    out -= self.kd_null * qvel
+    return out
+
+  def _feedforward(self, data, out):
+    model = self.model
+    rows = 3 if self.quaternion is None else 6
+    if rows != self._rows:
+      self._allocate(model.nv)
+
+    jac = self._jac[:rows]
+    jac_minv = self._jac_minv
+
+    mj.mj_jacBody(model, data, self._jac[:3], self._jac[3:], self.body_id)
+    # J M^-1 from the sparse factorization of the last step, no dense inverse of M needed
+    mj.mj_solveM(model, data, jac_minv, jac)
+
+    error = self._error
+    np.subtract(self.position, data.xpos[self.body_id], out=error[:3])
+    if rows == 6:
+      self._target_quat[0] = self.quaternion[3]
+      self._target_quat[1:] = self.quaternion[:3]
+      mj.mju_subQuat(self._quat, self._target_quat, data.xquat[self.body_id])
+      np.matmul(data.xmat[self.body_id].reshape(3, 3), self._quat, out=error[3:])
+
+    # task space inertia (J M^-1 J^T)^-1 is only ever applied, so it is kept as a cholesky factor
+    # of its inverse, the minimum pivot keeps it well defined close to singularities
+    task_inertia = self._task_inertia
+    np.matmul(jac_minv, jac.T, out=task_inertia)
+    mj.mju_cholFactor(task_inertia, 1e-6)
+
+    # F = Lambda * (kp * e - kd * J qd)
+    np.matmul(jac, data.qvel, out=self._task_vel)
+    self._task_vel *= self.kd[:rows]
+    np.multiply(self.kp[:rows], error, out=self._force)
+    self._force -= self._task_vel
+    mj.mju_cholSolve(self._force, task_inertia, self._force)
+
+    # posture torques M * qdd_posture projected into the null space of the task: N^T = I - J^T Jbar^T
+    self._posture[:] = 0
+    self._posture[self.dof_idx] = out
+    mj.mj_mulM(model, data, self._mposture, self._posture)
+    np.matmul(jac_minv, self._mposture, out=self._task_tmp)
+    mj.mju_cholSolve(self._task_tmp, task_inertia, self._task_tmp)
+    np.matmul(jac.T, self._task_tmp, out=self._tau)
+    self._mposture -= self._tau
+
+    np.matmul(jac.T, self._force, out=self._tau)
+    self._tau += self._mposture
+    self._tau += data.qfrc_bias
+
+    np.take(self._tau, self.dof_idx, out=out)
@@ -0,0 +1,312 @@
+from concurrent.futures import Future
+import queue
+import threading
+import time
+
+import torch
+
+from tinysim.core.transform import Transform
+from tinysim.simulation.joint import JointType
+
+
+def matrix_to_quat(matrix : torch.Tensor) -> torch.Tensor:
+  # rotation matrices (..., 3, 3) to xyzw quaternions with w >= 0
+  m = matrix
+  w = torch.sqrt(torch.clamp(1 + m[..., 0, 0] + m[..., 1, 1] + m[..., 2, 2], min=0)) / 2
+  x = torch.sqrt(torch.clamp(1 + m[..., 0, 0] - m[..., 1, 1] - m[..., 2, 2], min=0)) / 2
+  y = torch.sqrt(torch.clamp(1 - m[..., 0, 0] + m[..., 1, 1] - m[..., 2, 2], min=0)) / 2
+  z = torch.sqrt(torch.clamp(1 - m[..., 0, 0] - m[..., 1, 1] + m[..., 2, 2], min=0)) / 2
+
+  x = torch.copysign(x, m[..., 2, 1] - m[..., 1, 2])
+  y = torch.copysign(y, m[..., 0, 2] - m[..., 2, 0])
+  z = torch.copysign(z, m[..., 1, 0] - m[..., 0, 1])
+  return torch.stack([x, y, z, w], dim=-1)
+
+def axis_angle_to_matrix(axis : torch.Tensor, angle : torch.Tensor) -> torch.Tensor:
+  # rodrigues formula for unit axes (3,) and a batch of angles (B,)
+  skew = torch.zeros((3, 3), dtype=axis.dtype)
+  skew[0, 1], skew[0, 2], skew[1, 2] = -axis[2], axis[1], -axis[0]
+  skew = skew - skew.T
+
+  sin, cos = angle.sin()[:, None, None], angle.cos()[:, None, None]
+  return torch.eye(3, dtype=axis.dtype) + sin * skew + (1 - cos) * (skew @ skew)
+
+
+class _ChainPosition(torch.autograd.Function):
+  # end effector position with the analytic jacobian as backward, avoids building a graph through the chain
+
+  @staticmethod
+  def forward(ctx, qpos, chain):
+    position, _, jacobian = chain._evaluate(qpos.detach(), jacobian=True)
+    ctx.save_for_backward(jacobian[:, :3])
+    return position
+
+  @staticmethod
+  @torch.autograd.function.once_differentiable
+  def backward(ctx, grad):
+    jacobian, = ctx.saved_tensors
+    return torch.einsum("bi,bij->bj", grad, jacobian), None
+
+
+class KinematicChain:
+
+  def __init__(self, base : Transform, offsets : list[Transform], axes : torch.Tensor, hinge : torch.Tensor, tip : Transform,
+               ranges : torch.Tensor = None):
+    # offsets[i] is the fixed transform from joint i-1 (or the base) to joint i, tip the one from the last joint to the end effector
+    self.base_position = base.position
+    self.base_rotation = base.rotation.to_matrix()
+
+    self.offset_positions = torch.stack([offset.position for offset in offsets])
+    self.offset_rotations = torch.stack([offset.rotation.to_matrix() for offset in offsets])
+    self.axes = axes / axes.norm(dim=-1, keepdim=True)
+    self.hinge = hinge
+
+    self.tip_position = tip.position
+    self.tip_rotation = tip.rotation.to_matrix()
+    # joint limits (n, 2), only used by inverse kinematics
+    self.ranges = ranges
+
+  @classmethod
+  def from_robot(cls, robot) -> "KinematicChain":
+    # same composition as Robot.forward_kinematic, with consecutive fixed transforms folded together
+    offsets, axes, hinge, ranges, joint_ids = list(), list(), list(), list(), list()
+
+    transform = Transform.idenity()
+    for body in robot.chain:
+      transform = transform * body.itransform
+      for joint in body.joints:
+        assert joint.type in (JointType.HINGE, JointType.SLIDE)
+
+        offsets.append(transform * Transform(joint.translation, joint.twist))
+        axes.append(joint.axis)
+        hinge.append(joint.type == JointType.HINGE)
+        # unlimited joints have a range of (0, 0)
+        ranges.append(joint.range if joint.range[0] < joint.range[1] else (-torch.inf, torch.inf))
+        joint_ids.append(joint.id)
+        transform = Transform.idenity()
+
+    chain = cls(
+      robot.base.xtransform, offsets, torch.stack(axes).to(torch.float64),
+      torch.tensor(hinge), transform * robot.end_effector.itransform, torch.tensor(ranges, dtype=torch.float64)
+    )
+    chain.joint_ids = joint_ids
+    return chain
+
+  @property
+  def size(self) -> int:
+    return len(self.axes)
+
+  @property
+  def middle(self) -> torch.Tensor:
+    # middle of the joint ranges, zero for unlimited joints, a well conditioned initial guess for inverse kinematics
+    if self.ranges is None:
+      return torch.zeros(self.size, dtype=self.axes.dtype)
+    middle = self.ranges.mean(dim=1)
+    return torch.where(torch.isfinite(middle), middle, 0.0)
+
+  def clamp(self, qpos : torch.Tensor) -> torch.Tensor:
+    if self.ranges is None: return qpos
+    return torch.clamp(qpos, self.ranges[:, 0], self.ranges[:, 1])
+
+  def _evaluate(self, qpos : torch.Tensor, jacobian : bool = False) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    batch = qpos.shape[0]
+    rotation = self.base_rotation.expand(batch, 3, 3)
+    position = self.base_position.expand(batch, 3)
+
+    # joint origins and world axes, only needed for the jacobian
+    origins, axes = list(), list()
+
+    for i in range(self.size):
+      position = position + rotation @ self.offset_positions[i]
+      rotation = rotation @ self.offset_rotations[i]
+
+      if jacobian:
+        origins.append(position)
+        axes.append(rotation @ self.axes[i])
+
+      if self.hinge[i]:
+        rotation = rotation @ axis_angle_to_matrix(self.axes[i], qpos[:, i])
+      else:
+        position = position + (rotation @ self.axes[i]) * qpos[:, i, None]
+
+    position = position + rotation @ self.tip_position
+    rotation = rotation @ self.tip_rotation
+
+    if not jacobian:
+      return position, rotation, None
+
+    origins, axes = torch.stack(origins, dim=-1), torch.stack(axes, dim=-1)
+    linear = torch.where(self.hinge, torch.linalg.cross(axes, position[:, :, None] - origins, dim=1), axes)
+    angular = torch.where(self.hinge, axes, torch.zeros_like(axes))
+    return position, rotation, torch.cat([linear, angular], dim=1)
+
+  def forward(self, qpos : torch.Tensor) -> tuple[torch.Tensor, torch.Tensor]:
+    # end effector positions (B, 3) and rotation matrices (B, 3, 3), differentiable w.r.t. qpos (B, n)
+    position, rotation, _ = self._evaluate(torch.atleast_2d(qpos))
+    return position, rotation
+
+  def position(self, qpos : torch.Tensor) -> torch.Tensor:
+    # first order differentiable only, but much cheaper to backpropagate than forward
+    return _ChainPosition.apply(torch.atleast_2d(qpos), self)
+
+  def quaternion(self, qpos : torch.Tensor) -> torch.Tensor:
+    return matrix_to_quat(self.forward(qpos)[1])
+
+  def jacobian(self, qpos : torch.Tensor) -> torch.Tensor:
+    # geometric jacobian (B, 6, n) of the end effector, linear rows first
+    with torch.no_grad():
+      return self._evaluate(torch.atleast_2d(qpos), jacobian=True)[2]
+
+  def inverse(self, position : torch.Tensor, qpos : torch.Tensor, iterations : int = 200, tolerance : float = 1e-4,
+              damping : float = 0.05, max_step : float = 0.2) -> tuple[torch.Tensor, torch.Tensor]:
+    # batched damped least squares on the end effector position, returns the solutions and which of them converged
+    position = torch.atleast_2d(position)
+    # initial guesses outside the ranges would be pinned to a limit by the first clamp
+    qpos = self.clamp(torch.atleast_2d(qpos).to(position.dtype))
+    identity = torch.eye(3, dtype=qpos.dtype)
+
+    with torch.no_grad():
+      # rows drop out of the batch once they reached their target
+      active = torch.arange(qpos.shape[0])
+      for _ in range(iterations):
+        current, _, jacobian = self._evaluate(qpos[active], jacobian=True)
+        error = position[active] - current
+
+        remaining = error.norm(dim=1) > tolerance
+        active, error, linear = active[remaining], error[remaining], jacobian[remaining, :3]
+        if len(active) == 0: break
+
+        step = torch.linalg.solve(linear @ linear.transpose(1, 2) + damping**2 * identity, error)
+        step = (linear.transpose(1, 2) @ step[:, :, None])[..., 0]
+
+        # large steps far from the target overshoot into the joint limits
+        step *= torch.clamp(max_step / step.abs().amax(dim=1, keepdim=True), max=1.0)
+        qpos[active] = self.clamp(qpos[active] + step)
+
+      converged = (position - self._evaluate(qpos)[0]).norm(dim=1) <= tolerance
+
+    return qpos, converged
+
+
+class KinematicsService:
+  # answers fk / ik queries from any thread on a snapshot of the chain, queries are collected into micro batches
+
+  def __init__(self, chain : KinematicChain, max_batch : int = 1024, max_delay : float = 5e-4, workers : int = 1,
+               qpos : torch.Tensor = None, **ik_kwargs):
+    self.chain = chain
+    self.max_batch = max_batch
+    self.max_delay = max_delay
+    self.ik_kwargs = ik_kwargs
+    # initial guess of inverse queries without one
+    self.qpos = chain.middle if qpos is None else chain.clamp(torch.as_tensor(qpos, dtype=torch.float64))
+
+    self.batches = 0
+    self.queries = 0
+
+    self._queue = queue.SimpleQueue()
+    self._closed = False
+    self._lock = threading.Lock()
+    self._workers = [threading.Thread(target=self._run, daemon=True) for _ in range(workers)]
+    for worker in self._workers:
+      worker.start()
+
+  @classmethod
+  def from_robot(cls, robot, keyframe : int | str = None, **kwargs) -> "KinematicsService":
+    # initial guess from a keyframe (the home pose etc), the middle of the joint ranges otherwise
+    chain = KinematicChain.from_robot(robot)
+    qpos = None
+    if keyframe is not None:
+      model = robot.sim.model
+      qpos = torch.from_numpy(model.key(keyframe).qpos[model.jnt_qposadr[chain.joint_ids]].copy())
+    return cls(chain, qpos=qpos, **kwargs)
+
+  def forward(self, qpos : torch.Tensor) -> Future:
+    # resolves to end effector positions and xyzw quaternions, batched if qpos is
+    return self._submit("forward", (torch.as_tensor(qpos, dtype=torch.float64),))
+
+  def inverse(self, position : torch.Tensor, qpos : torch.Tensor = None) -> Future:
+    # resolves to joint positions and whether they reach the target, batched if position is
+    position = torch.as_tensor(position, dtype=torch.float64)
+    qpos = self.qpos.expand(torch.atleast_2d(position).shape[0], -1) if qpos is None else torch.as_tensor(qpos, dtype=torch.float64)
+    return self._submit("inverse", (position, qpos))
+
+  def close(self):
+    # no query can be queued behind the sentinels once the flag is set
+    with self._lock:
+      self._closed = True
+      for _ in self._workers:
+        self._queue.put(None)
+    for worker in self._workers:
+      worker.join()
+
+    # queries the workers did not pick up anymore are failed instead of left pending
+    while not self._queue.empty():
+      query = self._queue.get()
+      if query is not None and query[2].set_running_or_notify_cancel():
+        query[2].set_exception(RuntimeError("Kinematics service is closed"))
+
+  def _submit(self, kind : str, args : tuple) -> Future:
+    future = Future()
+    with self._lock:
+      if self._closed:
+        raise RuntimeError("Kinematics service is closed")
+      self._queue.put((kind, args, future))
+    return future
+
+  def _collect(self, first) -> tuple[list, bool]:
+    batch, rows = [first], torch.atleast_2d(first[1][0]).shape[0]
+    deadline = time.perf_counter() + self.max_delay
+
+    while rows < self.max_batch:
+      timeout = deadline - time.perf_counter()
+      if timeout <= 0: break
+      try:
+        query = self._queue.get(timeout=timeout)
+      except queue.Empty:
+        break
+
+      if query is None:
+        return batch, True
+
+      batch.append(query)
+      rows += torch.atleast_2d(query[1][0]).shape[0]
+
+    return batch, False
+
+  def _run(self):
+    stop = False
+    while not stop:
+      query = self._queue.get()
+      if query is None: return
+
+      batch, stop = self._collect(query)
+      with self._lock:
+        self.batches += 1
+        self.queries += len(batch)
+
+      for kind in ("forward", "inverse"):
+        queries = [query for query in batch if query[0] == kind and query[2].set_running_or_notify_cancel()]
+        if len(queries) == 0: continue
+
+        try:
+          self._evaluate(kind, queries)
+        except Exception as e:
+          for _, _, future in queries:
+            future.set_exception(e)
+
+  def _evaluate(self, kind : str, queries : list):
+    # queries are stacked into one batch and the results split up again, single queries get unbatched results
+    args = [tuple(torch.atleast_2d(arg) for arg in query[1]) for query in queries]
+    sizes = [arg[0].shape[0] for arg in args]
+    stacked = [torch.cat(arg) for arg in zip(*args)]
+
+    if kind == "forward":
+      with torch.no_grad():
+        position, rotation = self.chain.forward(*stacked)
+      results = (position, matrix_to_quat(rotation))
+    else:
+      results = self.chain.inverse(*stacked, **self.ik_kwargs)
+
+    for (_, query_args, future), *parts in zip(queries, *(result.split(sizes) for result in results)):
+      single = query_args[0].dim() == 1
+      future.set_result(tuple(part[0] if single else part for part in parts))
@@ -0,0 +1,230 @@
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+import mujoco as mj
+import numpy as np
+
+import tinysim.core.random as random
+
+
+class CollisionChecker:
+
+  def __init__(self, sim, robot, workers : int = 4, margin : float = 0.0, min_batch : int = 32):
+    model = sim.model
+
+    self.model = model
+    self.qpos_idx = robot.qpos_idx
+    joints = model.actuator_trnid[robot.actuator_idx, 0]
+    # unlimited joints report a range of [0, 0]
+    self.range = model.jnt_range[joints].copy()
+    self.range[model.jnt_limited[joints] == 0] = [-np.inf, np.inf]
+    # samples need finite bounds, unlimited joints are sampled within one turn without restricting valid states
+    self.sample_range = np.where(np.isfinite(self.range), self.range, [-np.pi, np.pi])
+    self.margin = margin
+    self.min_batch = min_batch
+
+    # scratch copies of the current state, only qpos of the planned joints is touched
+    self._pool = [mj.MjData(model) for _ in range(workers)]
+    for data in self._pool:
+      data.qpos[:] = sim.data.qpos
+      data.mocap_pos[:] = sim.data.mocap_pos
+      data.mocap_quat[:] = sim.data.mocap_quat
+
+    # innermost planned joint moving each body, contacts between bodies moved by the same joint (or none)
+    # can not be changed by planning (hand and fingers etc.), so they are ignored
+    segment = np.full(model.nbody, -1, dtype=np.intp)
+    segment[model.jnt_bodyid[model.actuator_trnid[robot.actuator_idx, 0]]] = model.jnt_bodyid[model.actuator_trnid[robot.actuator_idx, 0]]
+    for body in range(1, model.nbody):
+      if segment[body] == -1:
+        segment[body] = segment[model.body_parentid[body]]
+    self._geom_segment = segment[model.geom_bodyid]
+
+    self._executor = ThreadPoolExecutor(workers) if workers > 1 else None
+
+  @property
+  def size(self) -> int:
+    return len(self.qpos_idx)
+
+  def _check(self, data, qpos : np.ndarray, valid : np.ndarray):
+    for i, q in enumerate(qpos):
+      data.qpos[self.qpos_idx] = q
+
+      # no full step needed, kinematics + collision detection is enough to find contacts
+      mj.mj_kinematics(self.model, data)
+      mj.mj_collision(self.model, data)
+
+      ncon = data.ncon
+      if ncon == 0:
+        valid[i] = True
+        continue
+
+      segments = self._geom_segment[data.contact.geom]
+      valid[i] = not np.any((segments[:, 0] != segments[:, 1]) & (data.contact.dist < -self.margin))
+
+  def is_valid(self, qpos : np.ndarray) -> np.ndarray:
+    qpos = np.atleast_2d(qpos)
+    valid = np.zeros(len(qpos), dtype=bool)
+
+    in_range = np.all((qpos >= self.range[:, 0]) & (qpos <= self.range[:, 1]), axis=1)
+    todo = np.flatnonzero(in_range)
+    if len(todo) == 0: return valid
+
+    if self._executor is None or len(todo) < self.min_batch:
+      result = np.zeros(len(todo), dtype=bool)
+      self._check(self._pool[0], qpos[todo], result)
+      valid[todo] = result
+      return valid
+
+    chunks = np.array_split(todo, len(self._pool))
+    results = [np.zeros(len(chunk), dtype=bool) for chunk in chunks]
+    futures = [
+      self._executor.submit(self._check, data, qpos[chunk], result)
+      for data, chunk, result in zip(self._pool, chunks, results)
+    ]
+    for future in futures:
+      future.result()
+
+    for chunk, result in zip(chunks, results):
+      valid[chunk] = result
+    return valid
+
+  def interpolate(self, start : np.ndarray, end : np.ndarray, resolution : float) -> np.ndarray:
+    distance = np.abs(end - start).max()
+    if distance == 0: return start[None].copy()
+
+    # fixed spacing from the start, so sub edges between states revisit the same states
+    alpha = np.append(np.arange(0, distance, resolution) / distance, 1.0)[:, None]
+    return start + alpha * (end - start)
+
+  def free_prefix(self, states : np.ndarray, chunk : int = 64) -> int:
+    # number of valid states along the edge before the first collision, checked in batches of chunk states
+    for begin in range(0, len(states), chunk):
+      valid = self.is_valid(states[begin:begin + chunk])
+      if not valid.all():
+        return begin + int(np.argmin(valid))
+    return len(states)
+
+  def is_valid_edge(self, start : np.ndarray, end : np.ndarray, resolution : float) -> bool:
+    states = self.interpolate(start, end, resolution)
+    return self.free_prefix(states) == len(states)
+
+  def close(self):
+    if self._executor is not None:
+      self._executor.shutdown()
+
+
+class _Tree:
+
+  def __init__(self, root : np.ndarray, capacity : int):
+    self.nodes = np.zeros((capacity, len(root)))
+    self.parents = np.full(capacity, -1, dtype=np.intp)
+    self.nodes[0] = root
+    self.count = 1
+
+  def nearest(self, qpos : np.ndarray) -> int:
+    delta = self.nodes[:self.count] - qpos
+    return int(np.argmin(np.einsum("ij,ij->i", delta, delta)))
+
+  def add(self, qpos : np.ndarray, parent : int) -> int:
+    if self.count == len(self.nodes):
+      self.nodes = np.concatenate([self.nodes, np.zeros_like(self.nodes)])
+      self.parents = np.concatenate([self.parents, np.full_like(self.parents, -1)])
+
+    self.nodes[self.count] = qpos
+    self.parents[self.count] = parent
+    self.count += 1
+    return self.count - 1
+
+  def path(self, node : int) -> np.ndarray:
+    path = list()
+    while node != -1:
+      path.append(self.nodes[node])
+      node = self.parents[node]
+    return np.array(path)
+
+
+class MotionPlanner:
+
+  def __init__(self, sim, robot, step_size : float = 0.3, resolution : float = 0.05, max_iterations : int = 2000, workers : int = 4, **kwargs):
+    self.checker = CollisionChecker(sim, robot, workers=workers, **kwargs)
+    self.step_size = step_size
+    self.resolution = resolution
+    self.max_iterations = max_iterations
+
+    self.start = sim.data.qpos[robot.qpos_idx].copy()
+
+  def sample(self, count : int = 1) -> np.ndarray:
+    low, high = self.checker.sample_range[:, 0], self.checker.sample_range[:, 1]
+    return random.RANDOM_GEN.uniform(low, high, size=(count, self.checker.size))
+
+  def _extend(self, tree : _Tree, target : np.ndarray, connect : bool) -> tuple[int, bool]:
+    near = tree.nearest(target)
+    start = tree.nodes[near]
+
+    delta = target - start
+    distance = np.abs(delta).max()
+    end = target if connect or distance <= self.step_size else start + delta * (self.step_size / distance)
+
+    states = self.checker.interpolate(start, end, self.resolution)
+    free = self.checker.free_prefix(states)
+    if free <= 1: return near, False
+
+    # grow the tree along the free part of the segment with nodes every step_size
+    stride = max(int(round(self.step_size / self.resolution)), 1)
+    node = near
+    for idx in list(range(stride, free - 1, stride)) + [free - 1]:
+      node = tree.add(states[idx], node)
+
+    return node, free == len(states)
+
+  def plan(self, goal : np.ndarray, start : np.ndarray = None, smooth : bool = True, timeout : float = None) -> np.ndarray:
+    start = self.start if start is None else np.asarray(start, dtype=np.float64)
+    goal = np.asarray(goal, dtype=np.float64)
+
+    if not self.checker.is_valid(np.stack([start, goal])).all():
+      return None
+
+    if self.checker.is_valid_edge(start, goal, self.resolution):
+      return np.stack([start, goal])
+
+    deadline = None if timeout is None else time.perf_counter() + timeout
+    start_tree = tree_a = _Tree(start, 1024)
+    tree_b = _Tree(goal, 1024)
+
+    for sample in self.sample(self.max_iterations):
+      if deadline is not None and time.perf_counter() > deadline: break
+
+      node_a, _ = self._extend(tree_a, sample, connect=False)
+      node_b, reached = self._extend(tree_b, tree_a.nodes[node_a], connect=True)
+
+      if reached:
+        path_a, path_b = tree_a.path(node_a), tree_b.path(node_b)
+        if tree_a is not start_tree:
+          path_a, path_b = path_b, path_a
+
+        path = np.concatenate([path_a[::-1], path_b[1:]])
+        return self.shortcut(path) if smooth else path
+
+      tree_a, tree_b = tree_b, tree_a
+
+    return None
+
+  def shortcut(self, path : np.ndarray, iterations : int = 50) -> np.ndarray:
+    path = list(path)
+    tried = set()
+    for _ in range(iterations):
+      # every shortcut of the current path has been checked already
+      if len(tried) >= (len(path) - 1) * (len(path) - 2) // 2: break
+
+      i, j = np.sort(random.RANDOM_GEN.choice(len(path), size=2, replace=False))
+      if j - i <= 1 or (i, j) in tried: continue
+
+      tried.add((i, j))
+      if self.checker.is_valid_edge(path[i], path[j], self.resolution):
+        path = path[:i + 1] + path[j:]
+        tried = set()
+
+    return np.array(path)
+
+  def close(self):
+    self.checker.close()
@@ -16,6 +16,11 @@ from torchviz import make_dot
 
 
 from tinysim.core.profile import Profile
+from tinysim.core.metrics import ITERATION_BOUNDS
+from tinysim.simulation.controller import Controller
+from tinysim.simulation.trajectory import Trajectory, TrajectoryPlayer
+
+import mujoco as mj
 
 ROBOTS_PATH = Path(tinysim.__path__[0]) / "robots"
 ROBOTS = { path.name : path / "robot.py" for path in ROBOTS_PATH.iterdir() if path.is_dir() and (path /  (path.name + ".py")).is_file()}
@@ -44,7 +49,39 @@ class Robot(Element, ABC):
     Robot.ROBOTS[kind] += 1
     super().__init__(name, spec)
 
+    self.sim = None
+    self.controller : Controller = None
+    self.player : TrajectoryPlayer = None
+
   def _on_simulation_init(self, sim):
+    self.sim = sim
+    self._bind_actuators(sim.model)
+    self._bind_chain()
+
+    super()._on_simulation_init(sim)
+
+  def _on_simulation_recompile(self, sim):
+    self.sim = sim
+    self._bind_actuators(sim.model)
+    # bodies of compact simulations are handles into the tree of the previous model
+    self._bind_chain()
+
+    # the new model comes with the original actuator gains, reapply the controller on top of them
+    if self.controller is not None:
+      self.controller._rebind(self)
+      self.set_controller(self.controller)
+
+    super()._on_simulation_recompile(sim)
+
+  def _on_simulation_reset(self, sim):
+    # back to the state right after loading, controllers and running trajectories belong to the previous episode
+    self.player = None
+    if self.controller is not None:
+      self.set_controller(None)
+
+    super()._on_simulation_reset(sim)
+
+  def _bind_chain(self):
     self._base_to_end_effector = list() 
 
     current = self.end_effector
@@ -52,12 +89,76 @@ class Robot(Element, ABC):
       self._base_to_end_effector.append(current := current.parent)
 
     self._base_to_end_effector.reverse()
+
+  def _bind_actuators(self, model):
+    joint_ids = { joint.id for joint in self.joints }
+
+    # joint actuators of this robot, tendon actuators (gripper etc.) are left to the robot
+    self._actuator_idx = np.array([
+      act for act in range(model.nu) 
+      if model.actuator_trntype[act] == mj.mjtTrn.mjTRN_JOINT and model.actuator_trnid[act, 0] in joint_ids
+    ], dtype=np.intp)
+
+    actuated_joints = model.actuator_trnid[self._actuator_idx, 0]
+    self._qpos_idx = model.jnt_qposadr[actuated_joints].astype(np.intp)
+    self._dof_idx = model.jnt_dofadr[actuated_joints].astype(np.intp)
+
+    self._actuator_gains = model.actuator_gainprm[self._actuator_idx].copy()
+    self._actuator_biases = model.actuator_biasprm[self._actuator_idx].copy()
+
+  @property
+  def actuator_idx(self) -> np.ndarray:
+    return self._actuator_idx
   
+  @property
+  def qpos_idx(self) -> np.ndarray:
+    return self._qpos_idx
 
-    super()._on_simulation_init(sim)
+  @property
+  def dof_idx(self) -> np.ndarray:
+    return self._dof_idx
+
+  def set_controller(self, controller : str | Controller = None, **kwargs) -> Controller:
+    if isinstance(controller, str):
+      controller = Controller.create(controller, self, **kwargs)
+
+    model, data = self.sim.model, self.sim.data
+
+    if self.controller is not None and self.controller.OUTPUT == "qfrc_applied":
+      data.qfrc_applied[self.controller.out_idx] = 0
 
+    # torque level controllers bypass the actuators, so their servos must not fight them
+    torque_level = controller is not None and controller.OUTPUT == "qfrc_applied"
+    model.actuator_gainprm[self._actuator_idx] = 0 if torque_level else self._actuator_gains
+    model.actuator_biasprm[self._actuator_idx] = 0 if torque_level else self._actuator_biases
+
+    # a running trajectory needs a controller it can stream setpoints into
+    if controller is None or controller.SETPOINT is None:
+      self.player = None
+
+    self.controller = controller
+    return controller
+
+  def play(self, trajectory : Trajectory, rate : float = None) -> TrajectoryPlayer:
+    # setpoints are streamed into the controller target at the control rate, position control by default
+    if self.controller is None:
+      self.set_controller("position")
+    if self.controller.SETPOINT is None:
+      raise ValueError("Controller has no joint setpoint to play a trajectory on", self.controller.NAME)
+
+    rate = rate if rate is not None else 1.0 / self.sim.model.opt.timestep
+    self.player = TrajectoryPlayer(trajectory, rate, self.sim.data.time)
+    return self.player
 
   def step(self):
+    if self.player is not None:
+      self.player.step(self.controller, self.sim.data.time)
+      if self.player.done:
+        self.player = None
+
+    if self.controller is not None:
+      self.controller.apply(self.sim.data)
+
     super().step()
     
   @property
@@ -116,7 +217,9 @@ class Robot(Element, ABC):
       jacobian[i] = grad
 
 
+    iterations = 0
     while not np.allclose(transform.position.detach().numpy(), position, atol=1e-4):
+      iterations += 1
 
       loss = (transform.position - position)
       qpos = qpos - step_length * 2 * (jacobian.T @ loss)
@@ -125,6 +228,9 @@ class Robot(Element, ABC):
       for i in range(3):
         grad  = torch.autograd.grad(transform.position[i], [qpos], create_graph=True)[0]
         jacobian[i] = grad
+
+    if self.sim is not None and self.sim.metrics is not None:
+      self.sim.metrics.histogram("ik_iterations", ITERATION_BOUNDS).observe(iterations)
  
     return qpos.detach()
     
\ No newline at end of file
@@ -0,0 +1,141 @@
+import math
+
+import mujoco as mj
+import numpy as np
+
+from tinysim.scene.element import Element
+from tinysim.simulation.body import SceneBody
+
+
+# rays passing through geoms of ignored elements are continued at most this many times
+MAX_PASSES = 8
+# continued rays start this far behind the ignored hit, so they do not hit the same surface again
+PASS_EPSILON = 1e-6
+
+def group_mask(groups : set[int]) -> np.ndarray:
+  mask = np.zeros(mj.mjNGROUP, dtype=np.uint8)
+  mask[list(groups)] = 1
+  return mask
+
+
+class RaySensor:
+
+  def __init__(self, body : SceneBody, directions : np.ndarray, offset : np.ndarray = None, rotation : np.ndarray = None, groups : set[int] = None,
+               static : bool = True, exclude_body : bool = True, ignore : list[Element] = [], cutoff : float = mj.mjMAXVAL, rate : float = None):
+    directions = np.asarray(directions, dtype=np.float64).reshape(-1, 3)
+
+    # mounting rotation of the sensor on the body, xyzw like tinysim.core.transform.Rotation
+    if rotation is not None:
+      mount = np.zeros(9)
+      mj.mju_quat2Mat(mount, np.asarray(rotation, dtype=np.float64)[[3, 0, 1, 2]])
+      directions = directions @ mount.reshape(3, 3).T
+
+    self.body = body
+    # ray directions and origin offset in the local frame of the body
+    self.directions = np.ascontiguousarray(directions / np.linalg.norm(directions, axis=1, keepdims=True))
+    self.offset = np.zeros(3) if offset is None else np.asarray(offset, dtype=np.float64)
+
+    self.groups = None if groups is None else group_mask(groups)
+    self.static = static
+    self.exclude_body = exclude_body
+    self.ignore = list(ignore)
+    self.cutoff = cutoff
+    self.rate = rate
+
+    self.shape = (self.size,)
+    self.distances = np.full(self.size, -1.0)
+    self.geom_ids = np.full(self.size, -1, dtype=np.int32)
+
+    self._vec = np.zeros((self.size, 3))
+    self._origin = np.zeros(3)
+    self._ignored_geoms = None
+    self._next_update = -math.inf
+
+  @classmethod
+  def lidar(cls, body : SceneBody, horizontal : int = 360, vertical : int = 1,
+            horizontal_fov : float = 2 * math.pi, vertical_fov : float = 0.0, **kwargs) -> "RaySensor":
+    # full circle scans would hit the same angle twice
+    endpoint = horizontal_fov < 2 * math.pi
+    yaw = np.linspace(-horizontal_fov / 2, horizontal_fov / 2, horizontal, endpoint=endpoint)
+    pitch = np.linspace(-vertical_fov / 2, vertical_fov / 2, vertical) if vertical > 1 else np.zeros(1)
+
+    pitch, yaw = np.meshgrid(pitch, yaw, indexing="ij")
+    directions = np.stack([np.cos(pitch) * np.cos(yaw), np.cos(pitch) * np.sin(yaw), np.sin(pitch)], axis=-1)
+    return cls(body, directions, **kwargs)
+
+  @classmethod
+  def depth(cls, body : SceneBody, width : int = 64, height : int = 48, fovy : float = 45.0, **kwargs) -> "RaySensor":
+    # pinhole camera looking along -z with y up, like mujoco cameras, point it elsewhere with rotation
+    half = math.tan(math.radians(fovy) / 2)
+    x = np.linspace(-half * width / height, half * width / height, width)
+    y = np.linspace(half, -half, height)
+
+    x, y = np.meshgrid(x, y)
+    directions = np.stack([x, y, -np.ones_like(x)], axis=-1)
+    sensor = cls(body, directions, **kwargs)
+    sensor.shape = (height, width)
+    return sensor
+
+  @property
+  def size(self) -> int:
+    return len(self.directions)
+
+  @property
+  def hits(self) -> np.ndarray:
+    return self.geom_ids >= 0
+
+  @property
+  def points(self) -> np.ndarray:
+    return self._origin + self._vec * np.where(self.hits, self.distances, np.nan)[:, None]
+
+  def _bind(self, model):
+    self._ignored_geoms = None
+    if len(self.ignore) == 0: return
+
+    ignored = np.zeros(model.nbody, dtype=bool)
+    ignored[[body.id for element in self.ignore for body in element.bodies]] = True
+    self._ignored_geoms = ignored[model.geom_bodyid]
+
+  def update(self, model, data, force : bool = False) -> bool:
+    if not force and data.time < self._next_update: return False
+    if self.rate is not None:
+      self._next_update += 1.0 / self.rate
+      if self._next_update <= data.time:
+        self._next_update = data.time + 1.0 / self.rate
+
+    xmat = data.xmat[self.body.id].reshape(3, 3)
+    np.matmul(self.directions, xmat.T, out=self._vec)
+    np.add(data.xpos[self.body.id], xmat @ self.offset, out=self._origin)
+
+    body_exclude = self.body.id if self.exclude_body else -1
+    mj.mj_multiRay(
+      model, data, self._origin, self._vec.reshape(-1), self.groups, self.static,
+      body_exclude, self.geom_ids, self.distances, None, self.size, self.cutoff
+    )
+
+    if self._ignored_geoms is not None:
+      self._pass_ignored(model, data, body_exclude)
+
+    return True
+
+  def _pass_ignored(self, model, data, body_exclude : int):
+    # rays stopped by an ignored geom are continued behind it, the model itself is never modified
+    geom_id = np.zeros(1, dtype=np.int32)
+    for ray in np.flatnonzero(self.geom_ids >= 0):
+      if not self._ignored_geoms[self.geom_ids[ray]]: continue
+
+      vec = self._vec[ray]
+      distance = self.distances[ray]
+      for _ in range(MAX_PASSES):
+        distance += PASS_EPSILON
+        hit = mj.mj_ray(model, data, self._origin + distance * vec, vec, self.groups, self.static, body_exclude, geom_id)
+
+        if geom_id[0] < 0 or distance + hit > self.cutoff:
+          self.geom_ids[ray], self.distances[ray] = -1, -1.0
+          break
+
+        distance += hit
+        self.geom_ids[ray], self.distances[ray] = geom_id[0], distance
+        if not self._ignored_geoms[geom_id[0]]: break
+      else:
+        self.geom_ids[ray], self.distances[ray] = -1, -1.0
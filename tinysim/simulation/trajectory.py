@@ -0,0 +1,172 @@
+from typing import Iterator
+
+import numpy as np
+
+
+# peak velocity and acceleration of a rest to rest minimum jerk profile, in multiples of distance / T and distance / T^2
+MIN_JERK_PEAK_VEL = 15 / 8
+MIN_JERK_PEAK_ACC = 10 / np.sqrt(3)
+
+
+def quintic_coefficients(p0, v0, a0, p1, v1, a1, T) -> np.ndarray:
+  # coefficients of p(t) = sum c_k t^k matching position, velocity and acceleration at both ends, shape (..., 6, n)
+  T = T[..., None]
+  delta = p1 - p0
+
+  c3 = (20 * delta - (8 * v1 + 12 * v0) * T - (3 * a0 - a1) * T**2) / (2 * T**3)
+  c4 = (-30 * delta + (14 * v1 + 16 * v0) * T + (3 * a0 - 2 * a1) * T**2) / (2 * T**4)
+  c5 = (12 * delta - 6 * (v1 + v0) * T + (a0 - a1) * T**2) / (2 * T**5)
+
+  return np.stack([p0, v0, a0 / 2, c3, c4, c5], axis=-2)
+
+def polynomial(coefficients : np.ndarray, tau : np.ndarray, derivative : int = 0) -> np.ndarray:
+  # derivative of the quintics (..., 6, n) at times tau broadcastable to (..., n)
+  k = np.arange(6)
+  factor = np.ones(6)
+  for d in range(derivative):
+    factor *= np.maximum(k - d, 0)
+  tau = np.broadcast_to(tau, np.broadcast_shapes(np.shape(tau), coefficients.shape[:-2] + coefficients.shape[-1:]))
+  basis = factor * tau[..., None] ** np.maximum(k - derivative, 0)
+
+  return np.einsum("...nk,...kn->...n", basis, coefficients)
+
+
+class Trajectory:
+
+  def __init__(self, waypoints : np.ndarray, times : np.ndarray, velocities : np.ndarray = None, accelerations : np.ndarray = None):
+    self.waypoints = np.atleast_2d(np.asarray(waypoints, dtype=np.float64))
+    self.times = np.asarray(times, dtype=np.float64)
+    assert len(self.times) == len(self.waypoints) and len(self.waypoints) >= 2
+    assert np.all(np.diff(self.times) > 0), "Waypoint times have to be strictly increasing"
+
+    self.velocities = np.zeros_like(self.waypoints) if velocities is None else np.asarray(velocities, dtype=np.float64)
+    self.accelerations = np.zeros_like(self.waypoints) if accelerations is None else np.asarray(accelerations, dtype=np.float64)
+
+    p, v, a = self.waypoints, self.velocities, self.accelerations
+    self._coefficients = quintic_coefficients(p[:-1], v[:-1], a[:-1], p[1:], v[1:], a[1:], np.diff(self.times))
+
+  @classmethod
+  def min_jerk(cls, waypoints : np.ndarray, max_velocity, max_acceleration, min_duration : float = 1e-3) -> "Trajectory":
+    # stop at every waypoint, each segment takes as long as its slowest joint needs
+    waypoints = np.atleast_2d(np.asarray(waypoints, dtype=np.float64))
+    distance = np.abs(np.diff(waypoints, axis=0))
+
+    durations = np.maximum(
+      MIN_JERK_PEAK_VEL * distance / max_velocity,
+      np.sqrt(MIN_JERK_PEAK_ACC * distance / max_acceleration)
+    ).max(axis=1)
+
+    times = np.concatenate([[0.0], np.cumsum(np.maximum(durations, min_duration))])
+    return cls(waypoints, times)
+
+  @classmethod
+  def quintic(cls, waypoints : np.ndarray, max_velocity, max_acceleration, iterations : int = 10, samples : int = 32) -> "Trajectory":
+    # pass through via points without stopping, starting from min jerk timing and stretching segments that violate the limits
+    waypoints = np.atleast_2d(np.asarray(waypoints, dtype=np.float64))
+    times = cls.min_jerk(waypoints, max_velocity, max_acceleration).times
+
+    for _ in range(iterations):
+      trajectory = cls._through(waypoints, times)
+      scale = trajectory._limit_scale(max_velocity, max_acceleration, samples)
+      # min jerk timing saturates the limits exactly, leave room for round off
+      if np.all(scale <= 1.0 + 1e-9): return trajectory
+
+      times = np.concatenate([[0.0], np.cumsum(np.diff(times) * np.maximum(scale, 1.0))])
+
+    # stretching segments changes the via point velocities and need not settle, slowing down everything always satisfies the limits
+    trajectory = cls._through(waypoints, times)
+    return trajectory.retime(max(trajectory._limit_scale(max_velocity, max_acceleration, samples).max(), 1.0))
+
+  @classmethod
+  def _through(cls, waypoints : np.ndarray, times : np.ndarray) -> "Trajectory":
+    # average neighbouring slopes at via points, stop where the direction changes
+    slopes = np.diff(waypoints, axis=0) / np.diff(times)[:, None]
+    velocities = np.zeros_like(waypoints)
+    velocities[1:-1] = np.where(slopes[:-1] * slopes[1:] > 0, (slopes[:-1] + slopes[1:]) / 2, 0.0)
+    return cls(waypoints, times, velocities)
+
+  @classmethod
+  def from_robot(cls, robot, waypoints : np.ndarray, max_velocity = 1.0, max_acceleration = 2.0, kind : str = "min_jerk") -> "Trajectory":
+    # waypoints of the actuated joints of the robot, clamped to the joint ranges
+    ids = robot.sim.model.actuator_trnid[robot.actuator_idx, 0]
+    joints = { joint.id : joint for joint in robot.joints }
+    ranges = np.array([joints[i].range for i in ids], dtype=np.float64)
+    # unlimited joints have a range of (0, 0)
+    ranges[ranges[:, 0] >= ranges[:, 1]] = [-np.inf, np.inf]
+
+    waypoints = np.clip(np.atleast_2d(waypoints), ranges[:, 0], ranges[:, 1])
+    return getattr(cls, kind)(waypoints, max_velocity, max_acceleration)
+
+  @property
+  def duration(self) -> float:
+    return self.times[-1] - self.times[0]
+
+  def retime(self, scale : float) -> "Trajectory":
+    # slowing down by scale is exact for polynomials, velocities scale by 1/s and accelerations by 1/s^2
+    return Trajectory(
+      self.waypoints, self.times[0] + (self.times - self.times[0]) * scale,
+      self.velocities / scale, self.accelerations / scale**2
+    )
+
+  def evaluate(self, t : np.ndarray, derivative : int = 0) -> np.ndarray:
+    t = np.clip(np.asarray(t, dtype=np.float64), self.times[0], self.times[-1])
+    segment = np.clip(np.searchsorted(self.times, t, side="right") - 1, 0, len(self.times) - 2)
+    tau = (t - self.times[segment])[..., None]
+    return polynomial(self._coefficients[segment], tau, derivative)
+
+  def sample(self, rate : float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    t = self.times[0] + np.arange(int(np.floor(self.duration * rate)) + 1) / rate
+    return t, self.evaluate(t), self.evaluate(t, 1)
+
+  def stream(self, rate : float) -> Iterator[np.ndarray]:
+    _, positions, _ = self.sample(rate)
+    yield from positions
+
+  def _segment_peaks(self, samples : int, newton : int = 8) -> tuple[np.ndarray, np.ndarray]:
+    # largest sample of every segment and joint, refined with newton steps on the next derivative, so peaks between samples count
+    durations = np.diff(self.times)[:, None]
+    tau = np.linspace(0, 1, samples)[:, None] * durations[:, None]
+
+    peaks = list()
+    for derivative in (1, 2):
+      values = np.abs(polynomial(self._coefficients[:, None], tau, derivative))
+      peak = values.argmax(axis=1)
+      t = tau[np.arange(len(tau))[:, None], peak, 0]
+
+      for _ in range(newton):
+        slope = polynomial(self._coefficients, t, derivative + 1)
+        curvature = polynomial(self._coefficients, t, derivative + 2)
+        t = np.clip(t - slope / np.where(curvature == 0, np.inf, curvature), 0, durations)
+
+      peaks.append(np.maximum(values.max(axis=1), np.abs(polynomial(self._coefficients, t, derivative))))
+    return tuple(peaks)
+
+  def _limit_scale(self, max_velocity, max_acceleration, samples : int) -> np.ndarray:
+    # how much slower every segment has to run to stay within the limits
+    vel, acc = self._segment_peaks(samples)
+    return np.maximum(np.max(vel / max_velocity, axis=1), np.sqrt(np.max(acc / max_acceleration, axis=1)))
+
+
+class TrajectoryPlayer:
+
+  def __init__(self, trajectory : Trajectory, rate : float, start_time : float):
+    self.rate = rate
+    self.start_time = start_time
+    self.index = 0
+    _, self.positions, self.velocities = trajectory.sample(rate)
+
+  @property
+  def done(self) -> bool:
+    return self.index >= len(self.positions) - 1
+
+  def step(self, controller, time : float):
+    # setpoint for the current simulation time, robust against substeps and skipped steps
+    self.index = min(int((time - self.start_time) * self.rate), len(self.positions) - 1)
+
+    if controller.SETPOINT == "qvel":
+      np.copyto(controller.target, self.velocities[self.index])
+      return
+
+    np.copyto(controller.target, self.positions[self.index])
+    if hasattr(controller, "qvel_target"):
+      np.copyto(controller.qvel_target, self.velocities[self.index])
@@ -0,0 +1,245 @@
+import mujoco as mj
+import numpy as np
+import torch
+
+from tinysim.core.transform import Rotation, Transform
+from tinysim.simulation.joint import JointType
+
+
+class SceneTree:
+  # array backed scene graph, bodies in pre order so every subtree is a contiguous index range
+
+  def __init__(self, model, root : int = 0):
+    children = [list() for _ in range(model.nbody)]
+    for body in range(1, model.nbody):
+      children[model.body_parentid[body]].append(body)
+
+    order, stack = list(), [root]
+    while stack:
+      body = stack.pop()
+      order.append(body)
+      stack.extend(reversed(children[body]))
+
+    self.body_id = np.array(order, dtype=np.int32)
+    n = len(order)
+
+    local = np.full(model.nbody, -1, dtype=np.int32)
+    local[self.body_id] = np.arange(n, dtype=np.int32)
+    self.parent = local[model.body_parentid[self.body_id]]
+    self.parent[0] = -1
+    self._local = local
+
+    # walk all bodies up one level at a time, the number of passes is the height of the tree
+    self._depth = np.zeros(n, dtype=np.int32)
+    ancestor = self.parent.copy()
+    while (above := ancestor >= 0).any():
+      self._depth[above] += 1
+      ancestor[above] = self.parent[ancestor[above]]
+
+    # subtree of body i is [i, subtree_end[i]), filled in from the deepest level up
+    self.subtree_end = np.arange(1, n + 1, dtype=np.int32)
+    for level in range(self._depth.max(), 0, -1):
+      nodes = np.flatnonzero(self._depth == level)
+      np.maximum.at(self.subtree_end, self.parent[nodes], self.subtree_end[nodes])
+
+    # children of body i are child_index[child_start[i]:child_start[i + 1]], in pre order
+    self.child_index = (np.argsort(self.parent[1:], kind="stable") + 1).astype(np.int32)
+    self.child_start = np.searchsorted(self.parent[self.child_index], np.arange(n + 1)).astype(np.int32)
+
+    self.names = [model.body(body).name for body in order]
+    self.ipos = model.body_pos[self.body_id].copy()
+    self.iquat = model.body_quat[self.body_id][:, [1, 2, 3, 0]].copy()
+    self.movable = model.body_jntnum[self.body_id] > 0
+
+    self.xpos = np.zeros((n, 3))
+    self.xquat = np.tile(np.array([0.0, 0.0, 0.0, 1.0]), (n, 1))
+
+    # joints sorted by the local index of their body, joints of body i are [joint_start[i], joint_start[i + 1])
+    joints = np.flatnonzero(local[model.jnt_bodyid] >= 0)
+    joints = joints[np.argsort(local[model.jnt_bodyid[joints]], kind="stable")]
+
+    self.joint_id = joints.astype(np.int32)
+    self.joint_body = local[model.jnt_bodyid[joints]]
+    self.joint_start = np.searchsorted(self.joint_body, np.arange(n + 1)).astype(np.int32)
+    self.joint_names = [model.jnt(joint).name for joint in joints]
+    self.joint_type = model.jnt_type[joints].astype(np.int8)
+    self.joint_axis = model.jnt_axis[joints].copy()
+    self.joint_pos = model.jnt_pos[joints].copy()
+    self.joint_range = model.jnt_range[joints].copy()
+    self.qpos_adr = model.jnt_qposadr[joints].astype(np.int32)
+    self.dof_adr = model.jnt_dofadr[joints].astype(np.int32)
+
+    self.qpos = model.qpos0.copy()
+    self.qvel = np.zeros(model.nv)
+
+    self._index = { name : i for i, name in enumerate(self.names) }
+
+  def __len__(self):
+    return len(self.body_id)
+
+  @property
+  def root(self) -> "BodyHandle":
+    return BodyHandle(self, 0)
+
+  @property
+  def bodies(self) -> list["BodyHandle"]:
+    return [BodyHandle(self, i) for i in range(len(self))]
+
+  @property
+  def joints(self) -> list["JointHandle"]:
+    return [JointHandle(self, i) for i in range(len(self.joint_id))]
+
+  def body(self, ident : int | str) -> "BodyHandle":
+    if isinstance(ident, str):
+      return BodyHandle(self, self._index[ident])
+    return BodyHandle(self, int(self._local[ident]))
+
+  def children(self, index : int) -> np.ndarray:
+    return self.child_index[self.child_start[index]:self.child_start[index + 1]]
+
+  def subtree(self, index : int) -> slice:
+    return slice(index, self.subtree_end[index])
+
+  def depth(self) -> np.ndarray:
+    return self._depth
+
+  def update(self, data):
+    np.take(data.xpos, self.body_id, axis=0, out=self.xpos)
+    self.xquat[:, :3] = data.xquat[self.body_id, 1:]
+    self.xquat[:, 3] = data.xquat[self.body_id, 0]
+    np.copyto(self.qpos, data.qpos)
+    np.copyto(self.qvel, data.qvel)
+
+
+class BodyHandle:
+  __slots__ = ("_tree", "_index")
+
+  def __init__(self, tree : SceneTree, index : int):
+    self._tree = tree
+    self._index = index
+
+  @property
+  def name(self) -> str:
+    return self._tree.names[self._index]
+
+  @property
+  def id(self) -> int:
+    return int(self._tree.body_id[self._index])
+
+  @property
+  def movable(self) -> bool:
+    return bool(self._tree.movable[self._index])
+
+  @property
+  def parent(self) -> "BodyHandle":
+    parent = self._tree.parent[self._index]
+    return BodyHandle(self._tree, int(parent)) if parent >= 0 else None
+
+  @property
+  def children(self) -> list["BodyHandle"]:
+    return [BodyHandle(self._tree, int(i)) for i in self._tree.children(self._index)]
+
+  @property
+  def joints(self) -> list["JointHandle"]:
+    tree = self._tree
+    return [JointHandle(tree, i) for i in range(tree.joint_start[self._index], tree.joint_start[self._index + 1])]
+
+  @property
+  def itransform(self) -> Transform:
+    return Transform(
+      position=torch.from_numpy(self._tree.ipos[self._index].copy()),
+      rotation=Rotation(torch.from_numpy(self._tree.iquat[self._index].copy()))
+    )
+
+  @property
+  def xtransform(self) -> Transform:
+    return Transform(
+      position=torch.from_numpy(self._tree.xpos[self._index].copy()),
+      rotation=Rotation(torch.from_numpy(self._tree.xquat[self._index].copy()))
+    )
+
+  def get_all_bodies(self) -> list["BodyHandle"]:
+    subtree = self._tree.subtree(self._index)
+    return [BodyHandle(self._tree, i) for i in range(subtree.start, subtree.stop)]
+
+  def get_all_joints(self) -> list["JointHandle"]:
+    tree = self._tree
+    start, stop = tree.joint_start[self._index], tree.joint_start[tree.subtree_end[self._index]]
+    return [JointHandle(tree, i) for i in range(start, stop)]
+
+  def __eq__(self, other):
+    return isinstance(other, BodyHandle) and other._tree is self._tree and other._index == self._index
+
+  def __hash__(self):
+    return hash((id(self._tree), self._index))
+
+  def __repr__(self):
+    return f"<BodyHandle {self.name} children=[{','.join(child.name for child in self.children)}]>"
+
+
+class JointHandle:
+  __slots__ = ("_tree", "_index")
+
+  def __init__(self, tree : SceneTree, index : int):
+    self._tree = tree
+    self._index = index
+
+  @property
+  def name(self) -> str:
+    return self._tree.joint_names[self._index]
+
+  @property
+  def id(self) -> int:
+    return int(self._tree.joint_id[self._index])
+
+  @property
+  def type(self) -> JointType:
+    return JointType.from_mj(mj.mjtJoint(self._tree.joint_type[self._index]))
+
+  @property
+  def body(self) -> BodyHandle:
+    return BodyHandle(self._tree, int(self._tree.joint_body[self._index]))
+
+  @property
+  def axis(self) -> torch.Tensor:
+    return torch.from_numpy(self._tree.joint_axis[self._index].copy())
+
+  @property
+  def translation(self) -> torch.Tensor:
+    return torch.from_numpy(self._tree.joint_pos[self._index].copy())
+
+  @property
+  def twist(self) -> Rotation:
+    # mujoco joints have no frame of their own
+    return Rotation.identity()
+
+  @property
+  def range(self) -> tuple[float, float]:
+    low, high = self._tree.joint_range[self._index]
+    return float(low), float(high)
+
+  @property
+  def qpos(self) -> np.ndarray:
+    adr = self._tree.qpos_adr[self._index]
+    return self._tree.qpos[adr:adr + 1]
+
+  @property
+  def qvel(self) -> np.ndarray:
+    adr = self._tree.dof_adr[self._index]
+    return self._tree.qvel[adr:adr + 1]
+
+  def transform(self, qpos = None) -> Transform:
+    # same convention as HingeJoint / SlideJoint
+    qpos = qpos if qpos is not None else torch.from_numpy(self.qpos.copy())
+    if self.type == JointType.SLIDE:
+      return Transform(position=self.translation + self.axis * qpos, rotation=self.twist)
+    return Transform(position=self.translation, rotation=self.twist * Rotation.from_rotvec(qpos * self.axis))
+
+  def __eq__(self, other):
+    return isinstance(other, JointHandle) and other._tree is self._tree and other._index == self._index
+
+  def __hash__(self):
+    return hash((id(self._tree), self._index))
+
+  def __repr__(self):
+    return f"<JointHandle {self.name} type={self.type} qpos={self.qpos.item():.2f} qvel={self.qvel.item():2f}>"